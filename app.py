@@ -1,8 +1,19 @@
+import io
 import os
-from flask import Flask, request, jsonify, render_template
+import json
+import time
+import base64
+import binascii
+import zipfile
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS, cross_origin
-from cnnClassifier.utils.common import decodeImage
+from werkzeug.exceptions import BadRequest
+from cnnClassifier.config.configuration import ConfigurationManager
 from cnnClassifier.pipeline.prediction import PredictionPipeline
+from cnnClassifier.pipeline.batching import MicroBatcher
+from cnnClassifier.pipeline.training_job import TrainingJobRunner
+from cnnClassifier.utils.monitoring import (REGISTRY, CONTENT_TYPE, HTTP_REQUESTS, HTTP_ERRORS,
+                                            HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT, PREDICT_STAGE_SECONDS)
 
 # Set environment variables for language
 os.putenv('LANG', 'en_US.UTF-8')
@@ -12,12 +23,85 @@ app = Flask(__name__)
 CORS(app)
 
 class ClientApp:
-    def __init__(self):
-        self.filename = "inputImage.jpg"
-        self.classifier = PredictionPipeline(self.filename)
+    def __init__(self, defer_load: bool = False):
+        """
+        Set up the prediction and training services.
 
-# Instantiate ClientApp
-clApp = ClientApp()
+        With `defer_load`, only fork-safe work happens here and the model is not
+        touched; `start()` must be called in each worker process to load the model
+        and start the background threads.
+        """
+        config_manager = ConfigurationManager()
+        self.config = config_manager.get_prediction_config()
+        self.trainer = TrainingJobRunner(config_manager.get_training_job_config())
+        self.classifier = PredictionPipeline(config=self.config, defer_load=True)
+        self.predictor = self.classifier
+
+        if self.classifier.cache is not None:
+            REGISTRY.register_collector(self.cache_metrics)
+
+        if not defer_load:
+            self.start()
+
+    def start(self):
+        """
+        Build the model and start the hot-reload and micro-batching threads.
+        """
+        self.classifier.load()
+
+        # Requests go through the micro-batcher when enabled, otherwise straight to the model
+        if self.config.micro_batching:
+            self.predictor = MicroBatcher(
+                self.classifier,
+                max_batch_size=self.config.max_batch_size,
+                max_wait_ms=self.config.max_wait_ms
+            )
+
+    def cache_metrics(self) -> list:
+        """
+        Prediction cache counters for the /metrics endpoint.
+        """
+        stats = self.classifier.cache.stats()
+        return [
+            ("cnn_prediction_cache_hits_total", "counter", "Prediction cache hits.", stats["hits"]),
+            ("cnn_prediction_cache_misses_total", "counter", "Prediction cache misses.", stats["misses"]),
+            ("cnn_prediction_cache_evictions_total", "counter", "Entries evicted by the LRU bounds.", stats["evictions"]),
+            ("cnn_prediction_cache_expirations_total", "counter", "Entries dropped after their TTL.", stats["expirations"]),
+            ("cnn_prediction_cache_entries", "gauge", "Entries in the prediction cache.", stats["entries"]),
+            ("cnn_prediction_cache_bytes", "gauge", "Estimated size of the prediction cache.", stats["bytes"]),
+        ]
+
+# Instantiate ClientApp; serve.py sets PREFORK_SERVER so the model is loaded after forking
+clApp = ClientApp(defer_load=os.environ.get("PREFORK_SERVER") == "1")
+
+
+@app.before_request
+def startRequestTimer():
+    g.request_start = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+
+@app.after_request
+def countRequest(response):
+    HTTP_REQUESTS.inc(endpoint=request.endpoint or "unknown", status=str(response.status_code))
+    return response
+
+
+@app.teardown_request
+def stopRequestTimer(exception=None):
+    # Streamed responses tear the request down twice, only the first one counts
+    start = g.pop("request_start", None)
+    if start is not None:
+        HTTP_IN_FLIGHT.dec()
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint or "unknown")
+
+
+@app.route("/metrics", methods=['GET'])
+def metricsRoute():
+    """
+    Expose serving metrics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
 
 @app.route("/", methods=['GET'])
 @cross_origin()
@@ -31,11 +115,62 @@ def home():
 @cross_origin()
 def trainRoute():
     """
-    Trigger the training process.
+    Start a background training run and return its job id right away.
+
+    Only one run is active at a time; while it runs, the existing job is returned.
+    """
+    try:
+        job, created = clApp.trainer.submit()
+    except Exception as e:
+        HTTP_ERRORS.inc(endpoint="trainRoute")
+        return jsonify({"error": str(e)}), 500
+    job["status_url"] = f"/train/{job['job_id']}"
+    return jsonify(job), 202 if created else 409
+
+
+@app.route("/train/<job_id>", methods=['GET'])
+@cross_origin()
+def trainStatusRoute(job_id):
+    """
+    Report the status, current stage, elapsed time and logs of a training job.
     """
-    os.system("python main.py")
-    os.system("dvc repro")
-    return "Training done successfully!"
+    job = clApp.trainer.status(job_id)
+    if job is None:
+        return jsonify({"error": f"unknown training job {job_id}"}), 404
+    return jsonify(job)
+
+IMAGE_MIMETYPES = ("image/jpeg", "image/png", "application/octet-stream")
+ZIP_MIMETYPES = ("application/zip", "application/x-zip-compressed")
+
+
+def _read_image_payload():
+    """
+    Return the encoded image of a /predict request without intermediate copies.
+
+    Raw image/jpeg or image/png bodies are read once into a buffer, multipart
+    uploads are handed over as the spooled file under "image", and JSON bodies
+    keep the original {"image": base64} format. Any other content type, and a
+    body that does not match its content type, is a bad request.
+    """
+    if request.mimetype in IMAGE_MIMETYPES:
+        return request.get_data(cache=False)
+    if request.mimetype == "multipart/form-data":
+        try:
+            return request.files["image"].stream
+        except KeyError:
+            raise BadRequest('multipart upload has no file under "image"')
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        try:
+            return base64.b64decode(payload['image'])
+        except (KeyError, TypeError):
+            raise BadRequest('JSON body must be an object with the base64 image under "image"')
+        except ValueError as e:
+            # binascii.Error, or a str that is not ASCII
+            raise BadRequest(f'"image" is not valid base64: {e}')
+    accepted = ", ".join(IMAGE_MIMETYPES + ("multipart/form-data", "application/json"))
+    raise BadRequest(f"unsupported content type {request.mimetype or '(none)'}, expected one of: {accepted}")
+
 
 @app.route("/predict", methods=['POST'])
 @cross_origin()
@@ -44,12 +179,86 @@ def predictRoute():
     Predict the class of the provided image.
     """
     try:
-        image = request.json['image']
-        decodeImage(image, clApp.filename)
-        result = clApp.classifier.predict()
-        return jsonify(result)
+        with PREDICT_STAGE_SECONDS.time(stage="parse"):
+            image = _read_image_payload()
+        result = clApp.predictor.predict_bytes(image)
+        with PREDICT_STAGE_SECONDS.time(stage="serialize"):
+            return jsonify(result)
+    except BadRequest as e:
+        HTTP_ERRORS.inc(endpoint="predictRoute")
+        return jsonify({"error": e.description}), 400
     except Exception as e:
+        HTTP_ERRORS.inc(endpoint="predictRoute")
         return jsonify({"error": str(e)})
 
+def _iter_zip_images(fileobj):
+    """
+    Yield (name, bytes) for every file in a zip archive, one member at a time.
+
+    The archive is rejected before anything is decompressed if it holds more
+    than `max_zip_members` files or a file larger than `max_zip_member_bytes`.
+    Reading stops at the size a member declares, so a forged size cannot
+    inflate past the limit either.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        members = [member for member in archive.infolist()
+                   if not member.is_dir() and not member.filename.startswith("__MACOSX/")]
+        if len(members) > clApp.config.max_zip_members:
+            raise ValueError(f"zip archive holds {len(members)} files, the limit is {clApp.config.max_zip_members}")
+        for member in members:
+            if member.file_size > clApp.config.max_zip_member_bytes:
+                raise ValueError(f"{member.filename} is {member.file_size} bytes uncompressed, "
+                                 f"the limit is {clApp.config.max_zip_member_bytes}")
+        for member in members:
+            yield member.filename, archive.read(member)
+
+
+def _iter_batch_images():
+    """
+    Yield (name, bytes) for the images of a /predict/batch request.
+
+    Accepts a JSON body {"images": [base64, ...]} (or a bare JSON list), multipart
+    uploads with one or more files under "images" (zip files are expanded), or a
+    raw application/zip body. Images are decoded lazily as the stream is consumed.
+    """
+    if request.is_json:
+        payload = request.get_json()
+        images = payload["images"] if isinstance(payload, dict) else payload
+        for index, encoded in enumerate(images):
+            try:
+                data = base64.b64decode(encoded)
+            except (binascii.Error, TypeError):
+                data = b""  # reported as an undecodable image on its own line
+            yield str(index), data
+    elif request.files:
+        for upload in request.files.getlist("images"):
+            if upload.mimetype in ZIP_MIMETYPES or upload.filename.lower().endswith(".zip"):
+                yield from _iter_zip_images(upload.stream)
+            else:
+                yield upload.filename, upload.read()
+    elif request.mimetype in ZIP_MIMETYPES:
+        # The zip central directory sits at the end, so the archive needs a seekable buffer
+        yield from _iter_zip_images(io.BytesIO(request.get_data(cache=False)))
+    else:
+        raise ValueError(f"unsupported content type for batch prediction: {request.mimetype}")
+
+
+@app.route("/predict/batch", methods=['POST'])
+@cross_origin()
+def predictBatchRoute():
+    """
+    Predict many images in one request, streaming one NDJSON line per image.
+    """
+    def generate():
+        try:
+            for result in clApp.classifier.predict_stream(_iter_batch_images()):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            HTTP_ERRORS.inc(endpoint="predictBatchRoute")
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=8080) # for AWS
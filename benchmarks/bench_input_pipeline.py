@@ -0,0 +1,119 @@
+"""
+Compare training input throughput of ImageDataGenerator.flow_from_dataframe
+against the tf.data loader and the preprocessed array cache, in images per
+second, with and without augmentation (per-image NumPy/SciPy transforms for
+ImageDataGenerator, one batched RandomAffineTransform resample for tf.data).
+
+Only the input pipeline is timed (no model), over the training subset of the
+ingested data. The first tf.data epoch fills the cache when --cache is set, so
+every pipeline is read for several epochs and the first one is reported apart.
+Run it from the repository root after data ingestion; the cache row needs the
+data_preprocessing stage to have run.
+
+Usage:
+    python benchmarks/bench_input_pipeline.py [--epochs 3] [--batch-size 16] [--cache]
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+import tensorflow as tf
+
+from cnnClassifier.components.augmentation import build_augmentation
+from cnnClassifier.components.data_loader import ImageDatasetLoader, CachedDatasetLoader
+from cnnClassifier.components.data_manifest import DataManifest
+from cnnClassifier.components.model_trainer import AUGMENTATION_KWARGS
+from cnnClassifier.config.configuration import ConfigurationManager
+
+
+def keras_epochs(config, manifest, batch_size: int, augmentation: bool):
+    kwargs = dict(rescale=1./255)
+    if augmentation:
+        kwargs.update(AUGMENTATION_KWARGS)
+    paths, labels, class_names = manifest.subset("training")
+    generator = tf.keras.preprocessing.image.ImageDataGenerator(**kwargs).flow_from_dataframe(
+        dataframe=pd.DataFrame({"filename": paths, "class": [class_names[label] for label in labels]}),
+        target_size=config.params_image_size[:-1],
+        batch_size=batch_size,
+        interpolation="bilinear",
+        classes=class_names,
+        validate_filenames=False,
+        shuffle=True
+    )
+    while True:
+        yield (generator[i] for i in range(len(generator)))
+        generator.on_epoch_end()
+
+
+def batch_augment(augmentation: bool):
+    if not augmentation:
+        return None
+    layers = build_augmentation(**AUGMENTATION_KWARGS)
+    return lambda images: layers(images, training=True)
+
+
+def tf_data_epochs(config, manifest, batch_size: int, augmentation: bool, cache: bool):
+    augment = batch_augment(augmentation)
+    dataset = ImageDatasetLoader(
+        manifest=manifest,
+        image_size=config.params_image_size,
+        batch_size=batch_size,
+        cache=cache
+    ).dataset(subset="training", shuffle=True, augment=augment)
+    while True:
+        yield iter(dataset)
+
+
+def cache_epochs(config, manifest, batch_size: int, augmentation: bool):
+    augment = batch_augment(augmentation)
+    dataset = CachedDatasetLoader(
+        directory=config.preprocessed_data,
+        image_size=config.params_image_size,
+        batch_size=batch_size,
+        manifest=manifest
+    ).dataset(subset="training", shuffle=True, augment=augment)
+    while True:
+        yield iter(dataset)
+
+
+def measure(epochs_iter, epochs: int) -> list:
+    rates = []
+    for _, batches in zip(range(epochs), epochs_iter):
+        images, start = 0, time.perf_counter()
+        for batch_images, _ in batches:
+            images += len(batch_images)
+        rates.append(images / (time.perf_counter() - start))
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--cache", action="store_true", help="cache decoded images in the tf.data pipeline")
+    args = parser.parse_args()
+
+    config = ConfigurationManager().get_training_config()
+    manifest = DataManifest.load(config.manifest_file)
+    batch_size = args.batch_size or config.params_batch_size
+
+    print(f"{'pipeline':<12}{'augment':>9}{'epoch 1 img/s':>15}{'later img/s':>13}{'speedup':>9}")
+    for augmentation in (False, True):
+        results = {}
+        pipelines = [
+            ("keras", keras_epochs(config, manifest, batch_size, augmentation)),
+            ("tf_data", tf_data_epochs(config, manifest, batch_size, augmentation, args.cache)),
+        ]
+        if os.path.exists(os.path.join(config.preprocessed_data, "meta.json")):
+            pipelines.append(("cache", cache_epochs(config, manifest, batch_size, augmentation)))
+        for name, epochs_iter in pipelines:
+            rates = measure(epochs_iter, args.epochs)
+            later = rates[1:] or rates
+            results[name] = sum(later) / len(later)
+            speedup = results[name] / results["keras"]
+            print(f"{name:<12}{str(augmentation):>9}{rates[0]:>15.1f}{results[name]:>13.1f}{speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Measure the scaling efficiency of multi-worker training on one machine.
+
+For every worker count N, N local training processes form a cluster on
+127.0.0.1 and train the prepared base model for a few epochs under
+MultiWorkerMirroredStrategy, each on BATCH_SIZE images per step.
+The chief's throughput summary gives the images/s of all workers, reported
+with the speedup over one worker and the scaling efficiency
+(images/s with N workers / (N x images/s with one)).
+
+The CPU cores are split between the workers, so on one machine this shows
+the overhead of the all-reduce and of the sharded input pipeline rather than
+the speedup of N machines. Run it from the repository root after the
+prepare_base_model (and data_preprocessing, for DATA_LOADER cache) stages;
+nothing under artifacts/ is overwritten.
+
+Usage:
+    python benchmarks/bench_multiworker.py [--workers 1 2 4] [--epochs 3] [--data-loader tf_data]
+"""
+import argparse
+import dataclasses
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+def free_ports(count: int) -> list:
+    sockets = [socket.socket() for _ in range(count)]
+    for sock in sockets:
+        sock.bind(("127.0.0.1", 0))
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+
+def run_worker(args):
+    import tensorflow as tf
+    from cnnClassifier.config.configuration import ConfigurationManager
+    from cnnClassifier.components.model_trainer import Training
+
+    tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    output = Path(args.output)
+    config = dataclasses.replace(
+        ConfigurationManager().get_training_config(),
+        trained_model_path=output / "model.h5",
+        checkpoint_dir=output / "checkpoints",
+        profile_dir=output / "profile",
+        profile_trace_steps=[0, 0],
+        measure_input_wait=True,
+        params_epochs=args.epochs,
+        params_data_loader=args.data_loader,
+        params_early_stopping_patience=0,
+        cluster_workers=args.cluster.split(","),
+        task_index=args.task_index
+    )
+    training = Training(config=config)
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train()
+
+
+def benchmark(workers: int, epochs: int, data_loader: str) -> dict:
+    cores = os.cpu_count() or 1
+    cluster = ",".join(f"127.0.0.1:{port}" for port in free_ports(workers))
+    env = dict(os.environ)
+    env.pop("TF_CONFIG", None)
+
+    with tempfile.TemporaryDirectory() as output:
+        processes = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--worker", "--cluster", cluster, "--task-index", str(index),
+                 "--epochs", str(epochs), "--data-loader", data_loader, "--threads", str(max(1, cores // workers)),
+                 "--output", output],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            for index in range(workers)
+        ]
+        errors = [process.communicate()[1] for process in processes]
+        for index, (process, error) in enumerate(zip(processes, errors)):
+            if process.returncode != 0:
+                raise RuntimeError(f"worker {index} of {workers} failed:\n{error.decode()[-2000:]}")
+
+        with open(os.path.join(output, "profile", "summary.json")) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--epochs", type=int, default=3, help="the first epoch is excluded from images/s")
+    parser.add_argument("--data-loader", choices=["tf_data", "cache"], default="tf_data",
+                        help="multi-worker training cannot use the keras loader")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cluster", help=argparse.SUPPRESS)
+    parser.add_argument("--task-index", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--threads", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"{'workers':>8}{'images/s':>12}{'ms/step':>10}{'input wait':>12}{'speedup':>10}{'efficiency':>12}")
+    baseline = None
+    for workers in args.workers:
+        summary = benchmark(workers, args.epochs, args.data_loader)
+        images_per_second = summary["images_per_second"]
+        if baseline is None:
+            baseline = images_per_second / workers
+        speedup = images_per_second / baseline
+        print(f"{workers:>8}{images_per_second:>12.1f}{summary['step_ms_mean']:>10.1f}"
+              f"{summary.get('input_wait_fraction', 0.0):>12.1%}{speedup:>10.2f}{speedup / workers:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
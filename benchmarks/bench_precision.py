@@ -0,0 +1,109 @@
+"""
+Compare dtype policies and XLA compilation for training and inference on CPU.
+
+For every combination of MIXED_PRECISION policy and JIT_COMPILE it reports:
+  - training step time of the prepared base model on real training batches,
+  - single-image inference latency and batched throughput of the trained model,
+  - validation accuracy of the trained model and its delta to float32 without
+    XLA, plus the largest difference in predicted probability.
+
+bfloat16 only pays off on CPUs with AVX512_BF16 or AMX; float16 compute on
+CPU is usually slower than float32 and is listed for completeness. Run it
+from the repository root after training.
+
+Usage:
+    python benchmarks/bench_precision.py [--steps 10] [--policies float32 mixed_bfloat16]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier.components.data_loader import ImageDatasetLoader, CachedDatasetLoader
+from cnnClassifier.components.data_manifest import DataManifest
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.utils.precision import PRECISION_POLICIES, set_precision_policy, with_precision_policy
+
+
+def load_subset(config, subset: str, batch_size: int):
+    loader_kwargs = dict(image_size=config.params_image_size, batch_size=batch_size,
+                         manifest=DataManifest.load(config.manifest_file))
+    if os.path.exists(os.path.join(config.preprocessed_data, "meta.json")):
+        loader = CachedDatasetLoader(directory=config.preprocessed_data, **loader_kwargs)
+    else:
+        loader = ImageDatasetLoader(**loader_kwargs)
+    batches = list(loader.dataset(subset=subset, shuffle=False))
+    return [images.numpy() for images, _ in batches], np.concatenate([labels.numpy() for _, labels in batches])
+
+
+def build(path, policy: str, jit_compile: bool, learning_rate: float = None) -> tf.keras.Model:
+    set_precision_policy(policy)
+    model = with_precision_policy(tf.keras.models.load_model(path), policy)
+    if learning_rate is not None:
+        model.compile(
+            optimizer=tf.keras.optimizers.SGD(learning_rate=learning_rate),
+            loss=tf.keras.losses.CategoricalCrossentropy(),
+            metrics=["accuracy"],
+            jit_compile=jit_compile
+        )
+    model.jit_compile = jit_compile
+    return model
+
+
+def median_seconds(fn, repeats: int) -> float:
+    fn()  # trace and compile
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=10, help="timed repetitions per measurement")
+    parser.add_argument("--policies", nargs="+", default=list(PRECISION_POLICIES), choices=PRECISION_POLICIES)
+    args = parser.parse_args()
+
+    manager = ConfigurationManager()
+    config = manager.get_training_config()
+    learning_rate = manager.params.LEARNING_RATE
+    batch_size = config.params_batch_size
+
+    train_images, train_labels = load_subset(config, "training", batch_size)
+    valid_images, valid_labels = load_subset(config, "validation", batch_size)
+    train_batch = (train_images[0], train_labels[:len(train_images[0])])
+    single = valid_images[0][:1]
+
+    print(f"{'policy':<16}{'xla':>5}{'train ms/step':>15}{'infer ms (1)':>14}{'infer img/s':>13}"
+          f"{'accuracy':>10}{'delta':>8}{'max |dp|':>10}")
+    baseline = None
+    for policy in args.policies:
+        for jit_compile in (False, True):
+            try:
+                trainee = build(config.updated_base_model_path, policy, jit_compile, learning_rate)
+                train_step = median_seconds(lambda: trainee.train_on_batch(*train_batch), args.steps)
+
+                model = build(config.trained_model_path, policy, jit_compile)
+                latency = median_seconds(lambda: model.predict_on_batch(single), args.steps)
+                batch_seconds = median_seconds(lambda: model.predict_on_batch(valid_images[0]), args.steps)
+                probabilities = np.concatenate([model.predict_on_batch(images) for images in valid_images])
+            except Exception as e:
+                print(f"{policy:<16}{str(jit_compile):>5}  failed: {type(e).__name__}: {str(e).splitlines()[0]}")
+                continue
+
+            accuracy = float(np.mean(probabilities.argmax(axis=1) == valid_labels.argmax(axis=1)))
+            if baseline is None:
+                baseline = (accuracy, probabilities)
+            print(f"{policy:<16}{str(jit_compile):>5}{train_step * 1e3:>15.1f}{latency * 1e3:>14.2f}"
+                  f"{len(valid_images[0]) / batch_seconds:>13.1f}{accuracy:>10.4f}{accuracy - baseline[0]:>+8.4f}"
+                  f"{np.abs(probabilities - baseline[1]).max():>10.5f}")
+    set_precision_policy("float32")
+
+
+if __name__ == "__main__":
+    main()
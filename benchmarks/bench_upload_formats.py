@@ -0,0 +1,104 @@
+"""
+Compare request size and server-side decode time of the /predict upload formats.
+
+For each format the request body is built once, then parsed and decoded the
+same way app.py does it (without running the model) for a number of rounds.
+
+Usage:
+    python benchmarks/bench_upload_formats.py [--image path/to/slice.jpg] [--rounds 200]
+"""
+import argparse
+import base64
+import io
+import json
+import statistics
+import time
+
+import numpy as np
+from PIL import Image
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from cnnClassifier.pipeline.prediction import decode_image
+
+IMAGE_SIZE = [224, 224, 3]
+
+
+def synthetic_image(fmt: str) -> bytes:
+    """A 512x512 grayscale-ish CT-like slice encoded as `fmt`."""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:512, :512]
+    body = ((yy - 256) ** 2 + (xx - 256) ** 2 < 220 ** 2) * 120.0
+    noise = rng.normal(0, 25, size=body.shape)
+    pixels = np.clip(body + noise, 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).convert("RGB").save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def build_requests(jpeg: bytes, png: bytes) -> dict:
+    """Raw WSGI environ builders for every supported /predict format."""
+    return {
+        "json+base64 (jpeg)": dict(json={"image": base64.b64encode(jpeg).decode()}),
+        "raw image/jpeg": dict(data=jpeg, content_type="image/jpeg"),
+        "raw image/png": dict(data=png, content_type="image/png"),
+        "multipart (jpeg)": dict(data={"image": (io.BytesIO(jpeg), "slice.jpg", "image/jpeg")},
+                                 content_type="multipart/form-data"),
+    }
+
+
+def read_payload(req: Request):
+    """Mirror of app._read_image_payload."""
+    if req.mimetype in ("image/jpeg", "image/png", "application/octet-stream"):
+        return req.get_data(cache=False)
+    if req.mimetype == "multipart/form-data":
+        return req.files["image"].stream
+    return base64.b64decode(json.loads(req.get_data())["image"])
+
+
+def bench(kwargs: dict, rounds: int) -> tuple:
+    builder = EnvironBuilder(method="POST", path="/predict", **kwargs)
+    environ = builder.get_environ()
+    body, content_type = environ["wsgi.input"].read(), environ["CONTENT_TYPE"]
+    builder.close()
+
+    parse_times, decode_times = [], []
+    for _ in range(rounds):
+        environ = EnvironBuilder(method="POST", path="/predict", data=body,
+                                 content_type=content_type).get_environ()
+        start = time.perf_counter()
+        payload = read_payload(Request(environ))
+        parsed = time.perf_counter()
+        decode_image(payload, IMAGE_SIZE)
+        decoded = time.perf_counter()
+        parse_times.append(parsed - start)
+        decode_times.append(decoded - parsed)
+    return len(body), statistics.median(parse_times), statistics.median(decode_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="JPEG image to use instead of a synthetic slice")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.image:
+        with Image.open(args.image) as img:
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, format="JPEG")
+            jpeg = buf.getvalue()
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, format="PNG")
+            png = buf.getvalue()
+    else:
+        jpeg, png = synthetic_image("JPEG"), synthetic_image("PNG")
+
+    print(f"{'format':<22}{'body bytes':>12}{'vs jpeg':>9}{'parse ms':>10}{'decode ms':>11}{'total ms':>10}")
+    for name, kwargs in build_requests(jpeg, png).items():
+        size, parse, decode = bench(kwargs, args.rounds)
+        print(f"{name:<22}{size:>12}{size / len(jpeg):>8.2f}x{parse * 1e3:>10.3f}{decode * 1e3:>11.3f}"
+              f"{(parse + decode) * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measure /predict throughput of serve.py against the number of worker processes.
+
+For every worker count a fresh server is started, warmed up, and hit by
+concurrent clients posting raw JPEG bodies for a fixed duration. After the
+load test the resident (RSS) and proportional (PSS, shared pages split between
+the processes mapping them) memory of each worker is read from /proc. Run it
+from the repository root on the target box (model/model.h5 must exist).
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1 2 4 8] [--clients 32] [--duration 20]
+"""
+import argparse
+import http.client
+import io
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def synthetic_jpeg() -> bytes:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, size=(512, 512, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def post(port: int, body: bytes, timeout: float = 60) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("POST", "/predict", body=body, headers={"Content-Type": "image/jpeg"})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def wait_until_ready(port: int, body: bytes, deadline: float):
+    while time.time() < deadline:
+        try:
+            if post(port, body, timeout=5) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"server on port {port} did not become ready")
+
+
+def load_test(port: int, body: bytes, clients: int, duration: float) -> tuple:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client():
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = post(port, body) == 200
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.time() - started
+
+
+def worker_memory(master_pid: int) -> tuple:
+    """
+    Mean RSS and PSS in MB of the gunicorn workers forked by `master_pid`.
+    """
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        pids = f.read().split()
+    rss, pss = [], []
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {line.split()[0]: int(line.split()[1]) for line in f if line.endswith("kB\n")}
+        rss.append(fields["Rss:"] / 1024)
+        pss.append(fields["Pss:"] / 1024)
+    return statistics.mean(rss), statistics.mean(pss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 8])
+    parser.add_argument("--threads", type=int, default=4, help="request threads per worker")
+    parser.add_argument("--intra-op-threads", type=int, default=None,
+                        help="TensorFlow threads per worker, defaults to cores / workers")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8181)
+    args = parser.parse_args()
+
+    body = synthetic_jpeg()
+    cores = os.cpu_count() or 1
+    print(f"{cores} cores, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>8}{'intra-op':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'speedup':>9}"
+          f"{'RSS MB':>9}{'PSS MB':>9}")
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        intra_op = args.intra_op_threads or max(1, cores // workers)
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--threads", str(args.threads),
+             "--intra-op-threads", str(intra_op), "--inter-op-threads", "1",
+             "--bind", f"127.0.0.1:{args.port}"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_ready(args.port, body, time.time() + 300)
+            load_test(args.port, body, args.clients, min(5, args.duration))  # warm every worker
+            latencies, errors, elapsed = load_test(args.port, body, args.clients, args.duration)
+            rss, pss = worker_memory(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+        print(f"{workers:>8}{intra_op:>10}{throughput:>10.1f}{quantiles[49] * 1e3:>10.1f}"
+              f"{quantiles[98] * 1e3:>10.1f}{errors:>8}{throughput / baseline:>8.2f}x{rss:>9.0f}{pss:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
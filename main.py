@@ -1,8 +1,10 @@
 from cnnClassifier import logger
 from cnnClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
-from cnnClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
-from cnnClassifier.pipeline.stage_03_model_trainer import ModelTrainingPipeline
-from cnnClassifier.pipeline.stage_04_model_evaluation import EvaluationPipeline
+from cnnClassifier.pipeline.stage_02_data_preprocessing import DataPreprocessingPipeline
+from cnnClassifier.pipeline.stage_03_prepare_base_model import PrepareBaseModelTrainingPipeline
+from cnnClassifier.pipeline.stage_04_model_trainer import ModelTrainingPipeline
+from cnnClassifier.pipeline.stage_05_model_evaluation import EvaluationPipeline
+from cnnClassifier.pipeline.stage_06_serving_model_export import ServingModelExportPipeline
 
 STAGE_NAME = "Data Ingestion stage"
 
@@ -16,6 +18,18 @@ except Exception as e:
     raise e
 
 
+STAGE_NAME = "Data Preprocessing stage"
+try:
+   logger.info(f"*******************")
+   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+   data_preprocessing = DataPreprocessingPipeline()
+   data_preprocessing.main()
+   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+except Exception as e:
+        logger.exception(e)
+        raise e
+
+
 STAGE_NAME = "Prepare base model"
 try: 
    logger.info(f"*******************")
@@ -50,4 +64,17 @@ try:
 
 except Exception as e:
         logger.exception(e)
-        raise e
\ No newline at end of file
+        raise e
+
+
+STAGE_NAME = "Serving model export stage"
+try:
+   logger.info(f"*******************")
+   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+   serving_model_export = ServingModelExportPipeline()
+   serving_model_export.main()
+   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+
+except Exception as e:
+        logger.exception(e)
+        raise e
@@ -0,0 +1,75 @@
+"""
+Production entry point: a pre-fork gunicorn server running several app.py
+worker processes on one host.
+
+The parent imports TensorFlow, Flask and the app, then forks the workers,
+which share those module pages copy-on-write. The TensorFlow runtime itself
+is not fork-safe (a child forked after it has run an op hangs), so the
+parent never touches the model: each worker reads, builds and warms up its
+own copy right after the fork, and model memory is paid once per worker.
+
+Usage:
+    python serve.py [--workers N] [--threads N] [--bind HOST:PORT]
+"""
+import os
+import argparse
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+
+
+def configure_tensorflow(intra_op_threads: int, inter_op_threads: int):
+    """
+    Limit TensorFlow's thread pools per worker; must run before any TensorFlow op.
+    """
+    os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(intra_op_threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", str(inter_op_threads))
+    os.environ.setdefault("OMP_NUM_THREADS", str(intra_op_threads))
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def main():
+    from gunicorn.app.base import BaseApplication
+
+    server_config = ConfigurationManager().get_server_config()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bind", default=server_config.bind)
+    parser.add_argument("--workers", type=int, default=server_config.workers)
+    parser.add_argument("--threads", type=int, default=server_config.threads)
+    parser.add_argument("--intra-op-threads", type=int, default=server_config.intra_op_threads)
+    parser.add_argument("--inter-op-threads", type=int, default=server_config.inter_op_threads)
+    args = parser.parse_args()
+
+    configure_tensorflow(args.intra_op_threads, args.inter_op_threads)
+
+    # Imported in the parent so every worker inherits the loaded modules; the model is loaded in post_fork
+    os.environ["PREFORK_SERVER"] = "1"
+    import app as app_module
+
+    def post_fork(server, worker):
+        app_module.clApp.start()
+        logger.info(f"Worker {worker.pid} ready with model {app_module.clApp.classifier.model_version[:12]}")
+
+    class PreforkServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", args.bind)
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("timeout", server_config.timeout)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            return app_module.app
+
+    logger.info(f"Starting {args.workers} workers x {args.threads} threads on {args.bind} "
+                f"(TensorFlow intra-op {args.intra_op_threads}, inter-op {args.inter_op_threads})")
+    PreforkServer().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+import json
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+
+
+def split_at_first_trainable(model: tf.keras.Model) -> tuple:
+    """
+    Split a model with a frozen backbone into the backbone and the trainable head.
+
+    The split point is the input of the first layer with trainable weights. The
+    head is rebuilt from the model's own layer objects, so training it updates
+    the weights of `model` in place and no copying back is needed.
+
+    Args:
+        model (tf.keras.Model): Model whose layers run one after another.
+
+    Returns:
+        tuple: (backbone, head) models, backbone output feeding the head input.
+    """
+    split = next((index for index, layer in enumerate(model.layers) if layer.trainable_weights), None)
+    if split is None:
+        raise ValueError("the model has no trainable layer to train on bottleneck features")
+
+    head_layers = model.layers[split:]
+    chained = all(layer.get_input_at(0) is previous.get_output_at(0)
+                  for previous, layer in zip(head_layers, head_layers[1:]))
+    if not chained or len(model.outputs) != 1 or head_layers[-1].get_output_at(0) is not model.outputs[0]:
+        raise ValueError("bottleneck features need the layers after the backbone to form a single chain")
+    if any(layer.trainable_weights for layer in model.layers[:split]):
+        raise ValueError("the backbone of the model is not frozen")
+
+    backbone = tf.keras.Model(inputs=model.input, outputs=head_layers[0].get_input_at(0), name="backbone")
+
+    features = tf.keras.Input(shape=backbone.output_shape[1:], name="bottleneck_features")
+    outputs = features
+    for layer in head_layers:
+        outputs = layer(outputs)
+    head = tf.keras.Model(inputs=features, outputs=outputs, name="head")
+    return backbone, head
+
+
+class BottleneckFeatureCache:
+    """
+    Backbone outputs of every image, computed once and kept on disk.
+
+    Files under `directory` per subset: `<subset>_features.npy`,
+    `<subset>_labels.npy` and `<subset>.json` holding the key they were built
+    for. The key covers the backbone weights and the input data, so a changed
+    base model, dataset, image size or split recomputes the features.
+    """
+    def __init__(self, directory: Path, key: str):
+        """
+        Initializes the cache.
+
+        Args:
+            directory (Path): Directory holding the cached features.
+            key (str): Identifies the backbone and data the features belong to, see `make_key`.
+        """
+        self.directory = Path(directory)
+        self.key = key
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, subset: str) -> tuple:
+        return (self.directory / f"{subset}_features.npy",
+                self.directory / f"{subset}_labels.npy",
+                self.directory / f"{subset}.json")
+
+    def load(self, subset: str):
+        """
+        Return the cached (features, labels) of a subset, or None when missing or stale.
+        """
+        features_path, labels_path, meta_path = self._paths(subset)
+        try:
+            with open(meta_path) as f:
+                if json.load(f)["key"] != self.key:
+                    return None
+            return np.load(features_path), np.load(labels_path)
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def extract(self, subset: str, backbone: tf.keras.Model, dataset: tf.data.Dataset, samples: int) -> tuple:
+        """
+        Run every image of a subset through the backbone once and store the result.
+
+        Args:
+            subset (str): "training" or "validation".
+            backbone (tf.keras.Model): The frozen part of the model.
+            dataset (tf.data.Dataset): Unshuffled, unaugmented (images, labels) batches.
+            samples (int): Number of images in the dataset.
+
+        Returns:
+            tuple: (features, labels) arrays.
+        """
+        features_path, labels_path, meta_path = self._paths(subset)
+        meta_path.unlink(missing_ok=True)
+
+        tmp_path = features_path.with_suffix(".tmp.npy")
+        features = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                             shape=(samples,) + tuple(backbone.output_shape[1:]))
+        labels = []
+        offset = 0
+        for images, batch_labels in dataset:
+            batch_features = backbone.predict_on_batch(images)
+            features[offset:offset + len(batch_features)] = batch_features
+            offset += len(batch_features)
+            labels.append(batch_labels.numpy())
+        features.flush()
+        del features
+        os.replace(tmp_path, features_path)
+        np.save(labels_path, np.concatenate(labels).astype(np.float32))
+
+        with open(meta_path, "w") as f:
+            json.dump({"key": self.key, "samples": offset}, f, indent=4)
+        logger.info(f"Cached bottleneck features of {offset} {subset} images in {self.directory}")
+        return np.load(features_path), np.load(labels_path)
+
+    def get(self, subset: str, backbone: tf.keras.Model, dataset: tf.data.Dataset, samples: int) -> tuple:
+        """
+        Cached features of a subset, extracting them first if needed.
+        """
+        cached = self.load(subset)
+        if cached is not None:
+            logger.info(f"Using cached bottleneck features of {len(cached[0])} {subset} images")
+            return cached
+        return self.extract(subset, backbone, dataset, samples)
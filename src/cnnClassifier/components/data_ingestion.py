@@ -1,10 +1,12 @@
 import os
-import gdown
-import zipfile
+from pathlib import Path
 
 from cnnClassifier import logger
-from cnnClassifier.utils.common import get_size
+from cnnClassifier.utils.common import get_size, get_file_hash
+from cnnClassifier.utils.download import download
+from cnnClassifier.utils.archive import extract_zip
 from cnnClassifier.entity.config_entity import DataIngestionConfig
+from cnnClassifier.components.data_manifest import DataManifest
 
 
 class DataIngestion:
@@ -14,22 +16,40 @@ class DataIngestion:
 
     
      
-    def download_file(self)-> str:
+    def download_file(self)-> bool:
         '''
-        Fetch data from the url
+        Fetch data from the url, unless the local file already matches it.
+        Resumes an interrupted download and verifies the SHA-256 from the config
+        or, without one, the digest pinned in sha256_file by the first download.
         '''
 
         try: 
             dataset_url = self.config.source_URL
-            zip_download_dir = self.config.local_data_file
+            zip_download_dir = Path(self.config.local_data_file)
             os.makedirs("artifacts/data_ingestion", exist_ok=True)
             logger.info(f"Downloading data from {dataset_url} into file {zip_download_dir}")
 
-            file_id = dataset_url.split("/")[-2]
-            prefix = 'https://drive.google.com/uc?/export=download&id='
-            gdown.download(prefix+file_id,zip_download_dir)
+            sha256_file = Path(self.config.sha256_file)
+            expected_sha256 = self.config.expected_sha256
+            if not expected_sha256 and sha256_file.exists():
+                expected_sha256 = sha256_file.read_text().strip()
+                logger.info(f"Verifying against the SHA-256 pinned in {sha256_file}")
 
-            logger.info(f"Downloaded data from {dataset_url} into file {zip_download_dir}")
+            downloaded = download(
+                url=dataset_url,
+                path=zip_download_dir,
+                expected_sha256=expected_sha256,
+                workers=self.config.download_workers,
+                chunk_size=self.config.download_chunk_mb << 20,
+                timeout=self.config.download_timeout
+            )
+
+            if not expected_sha256:
+                sha256_file.write_text(get_file_hash(zip_download_dir) + "\n")
+                logger.info(f"Pinned the SHA-256 of {zip_download_dir} in {sha256_file}")
+
+            logger.info(f"Data from {dataset_url} is in file {zip_download_dir}")
+            return downloaded
 
         except Exception as e:
             raise e
@@ -38,10 +58,44 @@ class DataIngestion:
     def extract_zip_file(self):
         """
         zip_file_path: str
-        Extracts the zip file into the data directory
+        Extracts the zip file into the data directory, members in parallel;
+        files already on disk with the same size and CRC are left untouched,
+        and files in the data directory the zip file no longer holds are deleted.
+        With extract_images False nothing is extracted, the images are read
+        from the zip file by the preprocessing stage instead.
         Function returns None
         """
         unzip_path = self.config.unzip_dir
         os.makedirs(unzip_path, exist_ok=True)
-        with zipfile.ZipFile(self.config.local_data_file, 'r') as zip_ref:
-            zip_ref.extractall(unzip_path)
\ No newline at end of file
+        if not self.config.extract_images:
+            os.makedirs(self.config.data_dir, exist_ok=True)
+            logger.info(f"Not extracting {self.config.local_data_file}, images are decoded from the archive")
+            return
+        extract_zip(self.config.local_data_file, unzip_path, num_workers=self.config.extract_workers,
+                    prune_dir=self.config.data_dir)
+
+    def update_manifest(self):
+        """
+        Writes the data manifest: every image with its class, size, modification
+        time (CRC for images left in the zip file), SHA-256 and training/validation subset.
+        Only images that are new or changed since the previous manifest are hashed.
+        """
+        try:
+            previous = DataManifest.load(self.config.manifest_file)
+        except FileNotFoundError:
+            previous = None
+
+        if self.config.extract_images:
+            manifest = DataManifest.scan(
+                data_dir=self.config.data_dir,
+                validation_split=self.config.params_validation_split,
+                previous=previous
+            )
+        else:
+            manifest = DataManifest.scan_archive(
+                archive=self.config.local_data_file,
+                data_dir=os.path.relpath(self.config.data_dir, self.config.unzip_dir),
+                validation_split=self.config.params_validation_split,
+                previous=previous
+            )
+        manifest.save(self.config.manifest_file)
@@ -0,0 +1,204 @@
+import os
+import json
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.components.data_manifest import DataManifest
+
+
+def with_threads(ds: tf.data.Dataset, threads: int) -> tf.data.Dataset:
+    """
+    Run a dataset's parallel map and prefetch on a private pool of `threads`
+    threads instead of TensorFlow's shared one; 0 leaves the dataset unchanged.
+    """
+    if not threads:
+        return ds
+    options = tf.data.Options()
+    options.threading.private_threadpool_size = threads
+    return ds.with_options(options)
+
+
+class ImageDatasetLoader:
+    """
+    tf.data replacement for ImageDataGenerator.flow_from_directory, reading the
+    images listed in the data manifest.
+
+    Images are decoded and resized in parallel TensorFlow ops
+    (num_parallel_calls=AUTOTUNE), batched, optionally cached in memory after
+    decoding, and prefetched so the model never waits on a single Python thread.
+
+    Attributes:
+        samples (int): Number of images in the subset.
+        class_indices (dict): Class name to label index.
+    """
+    def __init__(self, manifest: DataManifest, image_size: list, batch_size: int, cache: bool = False,
+                 threads: int = 0):
+        """
+        Initializes the loader.
+
+        Args:
+            manifest (DataManifest): The images and their training/validation split.
+            image_size (list): Target image size (height, width, channels).
+            batch_size (int): Images per batch.
+            cache (bool): Keep decoded images in memory after the first epoch.
+            threads (int): Size of the dataset's private thread pool, 0 for TensorFlow's shared pool.
+        """
+        self.manifest = manifest
+        self.image_size = list(image_size[:2])
+        self.batch_size = batch_size
+        self.cache = cache
+        self.threads = threads
+
+    def _decode(self, path: tf.Tensor, label: tf.Tensor) -> tuple:
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        image.set_shape([None, None, 3])
+        # Bilinear resize and 1./255 rescale, as in the ImageDataGenerator pipeline
+        image = tf.image.resize(image, self.image_size, method="bilinear", antialias=True)
+        return image * (1. / 255), label
+
+    def count(self, subset: str) -> int:
+        """
+        Number of images in a subset.
+        """
+        return len(self.manifest.subset_indices(subset))
+
+    def dataset(self, subset: str, shuffle: bool, augment=None, shard: tuple = None,
+                repeat: bool = False) -> tf.data.Dataset:
+        """
+        Builds the dataset of one subset, yielding (images, one-hot labels) batches.
+
+        Args:
+            subset (str): "training" or "validation".
+            shuffle (bool): Reshuffle the files every epoch.
+            augment (callable, optional): Applied to each batch of decoded images (training only).
+            shard (tuple, optional): (number of shards, index), keep only this shard's files.
+            repeat (bool): Repeat the files indefinitely instead of one epoch.
+
+        Returns:
+            tf.data.Dataset: One epoch of batches, or an endless stream with `repeat`.
+        """
+        paths, labels, class_names = self.manifest.subset(subset)
+        self.samples = len(paths)
+        self.class_indices = {name: index for index, name in enumerate(class_names)}
+        logger.info(f"Found {self.samples} images belonging to {len(class_names)} classes ({subset}, tf.data).")
+
+        one_hot = tf.one_hot(np.asarray(labels, dtype=np.int32), depth=len(class_names))
+        ds = tf.data.Dataset.from_tensor_slices((paths, one_hot))
+        if shard is not None:
+            # Before decoding, so every shard only reads its own files
+            ds = ds.shard(*shard)
+        ds = ds.map(self._decode, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+        if self.cache:
+            ds = ds.cache()
+        if shuffle:
+            ds = ds.shuffle(buffer_size=self.samples, reshuffle_each_iteration=True)
+        if repeat:
+            ds = ds.repeat()
+        ds = ds.batch(self.batch_size)
+        if augment is not None:
+            ds = ds.map(lambda images, labels: (augment(images), labels), num_parallel_calls=tf.data.AUTOTUNE)
+        return with_threads(ds.prefetch(tf.data.AUTOTUNE), self.threads)
+
+
+class CachedDatasetLoader:
+    """
+    Reads the arrays written by the data preprocessing stage instead of the
+    source images.
+
+    `images.npy` is memory-mapped, so nothing is decoded or resized and the
+    file is never loaded whole. Each batch is a copy: indexing the mapping
+    with the batch's rows reads them from the page cache into a new array.
+    Yields the same (images, one-hot labels) batches as ImageDatasetLoader.
+
+    Attributes:
+        samples (int): Number of images in the subset.
+        class_indices (dict): Class name to label index.
+    """
+    def __init__(self, directory: Path, image_size: list, batch_size: int, manifest: DataManifest,
+                 threads: int = 0):
+        """
+        Initializes the loader.
+
+        Args:
+            directory (Path): Directory written by the data preprocessing stage.
+            image_size (list): Expected image size (height, width, channels).
+            batch_size (int): Images per batch.
+            manifest (DataManifest): The training/validation split of the images.
+            threads (int): Size of the dataset's private thread pool, 0 for TensorFlow's shared pool.
+        """
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        if list(self.meta["image_size"]) != list(image_size):
+            raise ValueError(f"{directory} holds {self.meta['image_size']} images but IMAGE_SIZE is {list(image_size)}, "
+                             f"run the data_preprocessing stage again")
+
+        splits = manifest.splits()
+        if any(path not in splits for path in self.meta["files"]):
+            raise ValueError(f"{directory} holds images missing from the data manifest, run the data_preprocessing stage again")
+        self.splits = np.asarray([splits[path] for path in self.meta["files"]])
+
+        self.images = np.load(os.path.join(directory, "images.npy"), mmap_mode="r")
+        self.labels = np.load(os.path.join(directory, "labels.npy"))
+        self.image_size = list(image_size)
+        self.batch_size = batch_size
+        self.threads = threads
+        self.class_indices = {name: index for index, name in enumerate(self.meta["class_names"])}
+
+    def subset_indices(self, subset: str) -> np.ndarray:
+        """
+        Row indices of a subset, as assigned in the data manifest.
+        """
+        return np.flatnonzero(self.splits == subset)
+
+    def _gather(self, rows: np.ndarray) -> tuple:
+        # Sorted rows turn the copy out of the mapping into mostly sequential reads
+        rows = np.sort(rows)
+        one_hot = np.eye(len(self.class_indices), dtype=np.float32)[self.labels[rows]]
+        return np.asarray(self.images[rows]), one_hot
+
+    def count(self, subset: str) -> int:
+        """
+        Number of images in a subset.
+        """
+        return len(self.subset_indices(subset))
+
+    def dataset(self, subset: str, shuffle: bool, augment=None, shard: tuple = None,
+                repeat: bool = False) -> tf.data.Dataset:
+        """
+        Builds the dataset of one subset, yielding (images, one-hot labels) batches.
+
+        Args:
+            subset (str): "training" or "validation".
+            shuffle (bool): Reshuffle the rows every epoch.
+            augment (callable, optional): Applied to each batch of images (training only).
+            shard (tuple, optional): (number of shards, index), keep only this shard's rows.
+            repeat (bool): Repeat the rows indefinitely instead of one epoch.
+
+        Returns:
+            tf.data.Dataset: One epoch of batches, or an endless stream with `repeat`.
+        """
+        indices = self.subset_indices(subset)
+        self.samples = len(indices)
+        logger.info(f"Found {self.samples} images belonging to {len(self.class_indices)} classes ({subset}, preprocessed cache).")
+
+        def load_batch(rows):
+            images, labels = tf.numpy_function(self._gather, [rows], (tf.uint8, tf.float32))
+            images.set_shape([None] + self.image_size)
+            labels.set_shape([None, len(self.class_indices)])
+            images = tf.cast(images, tf.float32) * (1. / 255)
+            if augment is not None:
+                images = augment(images)
+            return images, labels
+
+        ds = tf.data.Dataset.from_tensor_slices(indices)
+        if shard is not None:
+            ds = ds.shard(*shard)
+        if shuffle:
+            ds = ds.shuffle(buffer_size=self.samples, reshuffle_each_iteration=True)
+        if repeat:
+            ds = ds.repeat()
+        ds = ds.batch(self.batch_size)
+        ds = ds.map(load_batch, num_parallel_calls=tf.data.AUTOTUNE)
+        return with_threads(ds.prefetch(tf.data.AUTOTUNE), self.threads)
@@ -0,0 +1,258 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import get_file_hash
+from cnnClassifier.utils.archive import ZipReader
+
+
+# Same extensions flow_from_directory picks up
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".ppm", ".tif", ".tiff")
+
+SUBSETS = ("training", "validation")
+
+
+def assign_split(sha256: str, validation_split: float) -> str:
+    """
+    Subset of a file from its content hash: the first 32 bits of the hash,
+    as a fraction of 2**32, below `validation_split` means validation.
+
+    The assignment does not depend on the other files, so adding images never
+    moves existing ones between subsets, and identical images always land in
+    the same subset.
+    """
+    return "validation" if int(sha256[:8], 16) / 2 ** 32 < validation_split else "training"
+
+
+class DataManifest:
+    """
+    Every ingested image with its class, size, modification time, SHA-256 and
+    subset, in one JSON file written by the data ingestion stage.
+
+    Later stages load the manifest instead of walking the data directory, and
+    all of them use its training/validation split. Files are sorted by class,
+    then by path, the order flow_from_directory uses.
+
+    A manifest can also describe the images inside a zip archive that was
+    never extracted (`scan_archive`); only the preprocessing stage, which
+    decodes them straight from the archive, can read those.
+
+    Attributes:
+        data_dir (Path): Directory with one sub-directory of images per class,
+            or its path inside `archive`.
+        validation_split (float): Fraction of the hash range assigned to validation.
+        class_names (list): Sorted class names; a label is an index into this list.
+        files (list): One dict per image with path (relative to data_dir), class,
+            size, mtime_ns (crc32 for archive members), sha256 and split.
+        archive (Path): Zip archive holding the images, None when they are extracted.
+    """
+    def __init__(self, data_dir: Path, validation_split: float, class_names: list, files: list,
+                 archive: Path = None):
+        self.data_dir = Path(data_dir)
+        self.validation_split = validation_split
+        self.class_names = class_names
+        self.files = files
+        self.archive = Path(archive) if archive is not None else None
+
+    @classmethod
+    def scan(cls, data_dir: Path, validation_split: float, previous: "DataManifest" = None,
+             num_workers: int = 0) -> "DataManifest":
+        """
+        Build the manifest of a data directory.
+
+        Files whose size and modification time match `previous` keep their
+        hash; only new and changed files are read.
+
+        Args:
+            data_dir (Path): Directory with one sub-directory of images per class.
+            validation_split (float): Fraction of the images assigned to validation.
+            previous (DataManifest, optional): Manifest of an earlier scan.
+            num_workers (int): Threads hashing files, 0 for one per core.
+
+        Returns:
+            DataManifest: The up-to-date manifest.
+        """
+        data_dir = Path(data_dir)
+        known = {entry["path"]: entry for entry in previous.files} if previous is not None else {}
+        class_names = sorted(entry.name for entry in os.scandir(data_dir) if entry.is_dir())
+
+        files, to_hash = [], []
+        for class_name in class_names:
+            for path in sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(data_dir / class_name)
+                for name in names
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ):
+                stat = os.stat(path)
+                relative = Path(path).relative_to(data_dir).as_posix()
+                entry = {"path": relative, "class": class_name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                old = known.get(relative)
+                if old is not None and (old["size"], old.get("mtime_ns")) == (entry["size"], entry["mtime_ns"]):
+                    entry["sha256"] = old["sha256"]
+                else:
+                    to_hash.append(entry)
+                files.append(entry)
+
+        return cls._finish(data_dir, validation_split, class_names, files, to_hash, known, num_workers,
+                           lambda entry: get_file_hash(data_dir / entry["path"]))
+
+    @classmethod
+    def scan_archive(cls, archive: Path, data_dir: str, validation_split: float, previous: "DataManifest" = None,
+                     num_workers: int = 0) -> "DataManifest":
+        """
+        Build the manifest of the images inside a zip archive, without extracting it.
+
+        Members whose size and CRC-32 match `previous` keep their hash; only
+        new and changed members are inflated and hashed.
+
+        Args:
+            archive (Path): The zip archive.
+            data_dir (str): Directory inside the archive with one sub-directory of images per class.
+            validation_split (float): Fraction of the images assigned to validation.
+            previous (DataManifest, optional): Manifest of an earlier scan.
+            num_workers (int): Threads hashing members, 0 for one per core.
+
+        Returns:
+            DataManifest: The up-to-date manifest.
+        """
+        reader = ZipReader(archive)
+        prefix = Path(data_dir).as_posix().strip("/") + "/"
+        known = {entry["path"]: entry for entry in previous.files} if previous is not None else {}
+
+        members = {}
+        for member in reader.members:
+            relative = member.filename[len(prefix):]
+            if member.is_dir() or not member.filename.startswith(prefix) or "/" not in relative:
+                continue
+            if relative.lower().endswith(IMAGE_EXTENSIONS):
+                members[relative] = member
+        class_names = sorted({relative.split("/", 1)[0] for relative in members})
+
+        files, to_hash = [], []
+        for relative in sorted(members, key=lambda relative: (relative.split("/", 1)[0], relative)):
+            member = members[relative]
+            entry = {"path": relative, "class": relative.split("/", 1)[0], "size": member.file_size, "crc32": member.CRC}
+            old = known.get(relative)
+            if old is not None and (old["size"], old.get("crc32")) == (entry["size"], entry["crc32"]):
+                entry["sha256"] = old["sha256"]
+            else:
+                to_hash.append(entry)
+            files.append(entry)
+
+        def member_hash(entry: dict) -> str:
+            digest = hashlib.sha256()
+            with reader.open(prefix + entry["path"]) as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            return digest.hexdigest()
+
+        return cls._finish(Path(prefix), validation_split, class_names, files, to_hash, known, num_workers,
+                           member_hash, archive=archive)
+
+    @classmethod
+    def _finish(cls, data_dir: Path, validation_split: float, class_names: list, files: list, to_hash: list,
+                known: dict, num_workers: int, hash_entry, archive: Path = None) -> "DataManifest":
+        """
+        Hash the new and changed files on a thread pool, assign their subsets and build the manifest.
+        """
+        workers = num_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for entry, sha256 in zip(to_hash, executor.map(hash_entry, to_hash)):
+                entry["sha256"] = sha256
+
+        for entry in files:
+            entry["split"] = assign_split(entry["sha256"], validation_split)
+
+        removed = len(set(known) - {entry["path"] for entry in files})
+        manifest = cls(data_dir, validation_split, class_names, files, archive=archive)
+        source = f"{data_dir} in {archive}" if archive is not None else data_dir
+        logger.info(f"Manifest of {source}: {len(files)} images, {len(to_hash)} hashed, {removed} removed, "
+                    f"{len(manifest.subset_indices('validation'))} in validation")
+        return manifest
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of every file's path, content and subset.
+        """
+        digest = hashlib.sha256()
+        for entry in self.files:
+            digest.update(f"{entry['path']}\0{entry['sha256']}\0{entry['split']}\n".encode())
+        return digest.hexdigest()
+
+    def save(self, path: Path):
+        """
+        Write the manifest as JSON; the file is replaced atomically.
+        """
+        path = Path(path)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "data_dir": self.data_dir.as_posix(),
+                "archive": self.archive.as_posix() if self.archive is not None else None,
+                "validation_split": self.validation_split,
+                "class_names": self.class_names,
+                "fingerprint": self.fingerprint,
+                "files": self.files,
+            }, f, indent=1)
+        os.replace(tmp_path, path)
+        logger.info(f"Manifest saved at: {path}")
+
+    @classmethod
+    def load(cls, path: Path) -> "DataManifest":
+        """
+        Load a manifest written by `save`.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No data manifest at {path}, run the data ingestion stage first") from None
+        return cls(data["data_dir"], data["validation_split"], data["class_names"], data["files"],
+                   archive=data.get("archive"))
+
+    def subset_indices(self, subset: str = None) -> list:
+        """
+        Positions in `files` of a subset's images, or of all images when `subset` is None.
+        """
+        if subset is not None and subset not in SUBSETS:
+            raise ValueError(f"Unknown subset {subset!r}, expected one of {SUBSETS}")
+        return [index for index, entry in enumerate(self.files) if subset is None or entry["split"] == subset]
+
+    def subset(self, subset: str = None) -> tuple:
+        """
+        The images of a subset, or all images when `subset` is None.
+
+        Returns:
+            tuple: (file paths, integer labels, class names)
+        """
+        if self.archive is not None:
+            raise ValueError(f"The images are inside {self.archive} and were not extracted; set "
+                             f"data_ingestion.extract_images to True, or DATA_LOADER to cache")
+        return self._entries(subset, lambda entry: os.path.join(self.data_dir, entry["path"]))
+
+    def members(self, subset: str = None) -> tuple:
+        """
+        The images of a subset as names of `archive` members, or all images when `subset` is None.
+
+        Returns:
+            tuple: (member names, integer labels, class names)
+        """
+        if self.archive is None:
+            raise ValueError("The manifest lists extracted images, not archive members")
+        return self._entries(subset, lambda entry: (self.data_dir / entry["path"]).as_posix())
+
+    def _entries(self, subset: str, location) -> tuple:
+        label = {name: index for index, name in enumerate(self.class_names)}
+        entries = [self.files[index] for index in self.subset_indices(subset)]
+        return [location(entry) for entry in entries], [label[entry["class"]] for entry in entries], self.class_names
+
+    def splits(self) -> dict:
+        """
+        Relative path to subset of every image.
+        """
+        return {entry["path"]: entry["split"] for entry in self.files}
@@ -0,0 +1,128 @@
+import io
+import os
+import json
+import hashlib
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import save_json
+from cnnClassifier.components.data_manifest import DataManifest
+from cnnClassifier.utils.archive import ZipReader
+from cnnClassifier.entity.config_entity import DataPreprocessingConfig
+
+
+class DataPreprocessing:
+    """
+    Decodes and resizes every ingested image once into a memory-mappable cache.
+
+    Writes, under `root_dir`:
+        images.npy: uint8 array (N, height, width, 3), resized like
+            ImageDataGenerator does (PIL bilinear, no rescale).
+        labels.npy: int32 class index per image.
+        meta.json: class names, image size, relative file paths and the
+            fingerprint the cache was built from.
+
+    The images are the ones listed in the data manifest. The fingerprint
+    hashes their paths and content hashes from the manifest together with
+    IMAGE_SIZE; the cache is rebuilt only when it changes. When the manifest
+    lists the members of a zip archive that was not extracted, the images are
+    decoded straight from the archive.
+    """
+    def __init__(self, config: DataPreprocessingConfig):
+        """
+        Initializes the DataPreprocessing with the given configuration.
+
+        Args:
+            config (DataPreprocessingConfig): Source directory, cache directory and image size.
+        """
+        self.config = config
+        self.manifest = DataManifest.load(config.manifest_file)
+        self.archive = ZipReader(self.manifest.archive) if self.manifest.archive is not None else None
+
+    def _meta_path(self) -> Path:
+        return Path(self.config.root_dir) / "meta.json"
+
+    def list_files(self) -> tuple:
+        """
+        List every image of the manifest in the order flow_from_directory uses.
+
+        Returns:
+            tuple: (file paths or archive member names, integer labels, class names)
+        """
+        if self.archive is not None:
+            return self.manifest.members()
+        return self.manifest.subset()
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the images' relative paths and content hashes plus IMAGE_SIZE.
+        """
+        digest = hashlib.sha256(json.dumps(list(self.config.params_image_size)).encode())
+        for entry in self.manifest.files:
+            digest.update(f"{entry['path']}\0{entry['sha256']}\n".encode())
+        return digest.hexdigest()
+
+    def is_up_to_date(self, fingerprint: str) -> bool:
+        """
+        Whether the existing cache was built from the same images and image size.
+        """
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)["fingerprint"] == fingerprint
+        except (FileNotFoundError, KeyError, ValueError):
+            return False
+
+    def _load_image(self, path: str) -> np.ndarray:
+        if self.archive is not None:
+            # Inflated in memory, the raw image is never written to disk
+            path = io.BytesIO(self.archive.read(path))
+        image = tf.keras.utils.load_img(
+            path,
+            target_size=self.config.params_image_size[:-1],
+            interpolation="bilinear"  # Same as the training data generators
+        )
+        return np.asarray(image, dtype=np.uint8)
+
+    def preprocess(self):
+        """
+        Build the cache unless it is already up to date.
+        """
+        paths, labels, class_names = self.list_files()
+        fingerprint = self.fingerprint()
+        if self.is_up_to_date(fingerprint):
+            logger.info(f"Preprocessed data in {self.config.root_dir} is up to date ({fingerprint[:12]}), skipping")
+            return
+
+        root_dir = Path(self.config.root_dir)
+        height, width, channels = self.config.params_image_size
+        # meta.json is removed first and written last, so a half-written cache is never used
+        self._meta_path().unlink(missing_ok=True)
+
+        tmp_images = root_dir / "images.tmp.npy"
+        images = np.lib.format.open_memmap(tmp_images, mode="w+", dtype=np.uint8,
+                                           shape=(len(paths), height, width, channels))
+
+        def write(index: int):
+            images[index] = self._load_image(paths[index])
+
+        workers = self.config.num_workers or os.cpu_count() or 1
+        logger.info(f"Decoding {len(paths)} images into {root_dir} with {workers} threads")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises the first decode error
+            list(executor.map(write, range(len(paths))))
+        images.flush()
+        del images
+        os.replace(tmp_images, root_dir / "images.npy")
+        np.save(root_dir / "labels.npy", np.asarray(labels, dtype=np.int32))
+
+        save_json(path=self._meta_path(), data={
+            "fingerprint": fingerprint,
+            "image_size": list(self.config.params_image_size),
+            "class_names": class_names,
+            "count": len(paths),
+            "files": [entry["path"] for entry in self.manifest.files],
+        })
+        logger.info(f"Preprocessed {len(paths)} images ({fingerprint[:12]})")
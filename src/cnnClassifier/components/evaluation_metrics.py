@@ -0,0 +1,115 @@
+import numpy as np
+
+
+# Probabilities are clipped like Keras' categorical crossentropy before the log
+EPSILON = 1e-7
+
+
+class StreamingMetrics:
+    """
+    Classification metrics accumulated batch by batch.
+
+    Each `update` adds a batch of one-hot labels and predicted probabilities
+    to running sums, a confusion matrix and two histograms of the positive
+    class probability (one for positive images, one for negative ones), so
+    memory does not grow with the number of images. ROC-AUC is computed from
+    the histograms; with `roc_bins` bins it is exact up to scores that fall
+    into the same bin, which are counted as ties.
+
+    Attributes:
+        class_names (list): Class names, in label order.
+        positive (int): Label of the positive class for sensitivity, specificity and ROC-AUC.
+        roc_bins (int): Number of equal-width probability bins of the ROC histograms.
+    """
+    def __init__(self, class_names: list, positive_class: str, roc_bins: int = 1000):
+        """
+        Initializes empty metrics.
+
+        Args:
+            class_names (list): Class names, in label order.
+            positive_class (str): Name of the positive class, the finding the screen detects.
+            roc_bins (int): Number of probability bins of the ROC histograms.
+        """
+        if positive_class not in class_names:
+            raise ValueError(f"Positive class {positive_class!r} is not one of {class_names}")
+        self.class_names = list(class_names)
+        self.positive = self.class_names.index(positive_class)
+        self.roc_bins = roc_bins
+
+        num_classes = len(self.class_names)
+        self.count = 0
+        self.loss_sum = 0.0
+        self.confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+        self.positive_scores = np.zeros(roc_bins, dtype=np.int64)
+        self.negative_scores = np.zeros(roc_bins, dtype=np.int64)
+
+    def update(self, y_true: np.ndarray, y_prob: np.ndarray):
+        """
+        Add one batch.
+
+        Args:
+            y_true (np.ndarray): One-hot labels, shape (batch, classes).
+            y_prob (np.ndarray): Predicted probabilities, shape (batch, classes).
+        """
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_prob = np.asarray(y_prob, dtype=np.float64)
+        num_classes = len(self.class_names)
+
+        probs = np.clip(y_prob / y_prob.sum(axis=1, keepdims=True), EPSILON, 1. - EPSILON)
+        self.loss_sum += float(-(y_true * np.log(probs)).sum())
+        self.count += len(y_true)
+
+        labels = y_true.argmax(axis=1)
+        predictions = y_prob.argmax(axis=1)
+        self.confusion += np.bincount(
+            labels * num_classes + predictions, minlength=num_classes * num_classes
+        ).reshape(num_classes, num_classes)
+
+        bins = np.minimum((y_prob[:, self.positive] * self.roc_bins).astype(np.int64), self.roc_bins - 1)
+        is_positive = labels == self.positive
+        self.positive_scores += np.bincount(bins[is_positive], minlength=self.roc_bins)
+        self.negative_scores += np.bincount(bins[~is_positive], minlength=self.roc_bins)
+
+    def roc_auc(self) -> float:
+        """
+        Area under the ROC curve of the positive class, NaN without both positive and negative images.
+        """
+        positives, negatives = self.positive_scores.sum(), self.negative_scores.sum()
+        if positives == 0 or negatives == 0:
+            return float("nan")
+        # Thresholds from the highest bin down; images in one bin form a diagonal segment
+        tpr = np.concatenate([[0.], np.cumsum(self.positive_scores[::-1]) / positives])
+        fpr = np.concatenate([[0.], np.cumsum(self.negative_scores[::-1]) / negatives])
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def result(self) -> dict:
+        """
+        The metrics of every batch added so far.
+
+        Returns:
+            dict: loss, accuracy, sensitivity, specificity, precision and
+            roc_auc of the positive class, and the confusion matrix with true
+            classes as rows and predicted classes as columns.
+        """
+        def ratio(numerator, denominator):
+            return float(numerator / denominator) if denominator else float("nan")
+
+        true_positives = self.confusion[self.positive, self.positive]
+        actual_positives = self.confusion[self.positive].sum()
+        predicted_positives = self.confusion[:, self.positive].sum()
+        true_negatives = self.count - actual_positives - predicted_positives + true_positives
+
+        return {
+            "loss": ratio(self.loss_sum, self.count),
+            "accuracy": ratio(np.trace(self.confusion), self.count),
+            "sensitivity": ratio(true_positives, actual_positives),
+            "specificity": ratio(true_negatives, self.count - actual_positives),
+            "precision": ratio(true_positives, predicted_positives),
+            "roc_auc": self.roc_auc(),
+            "images": int(self.count),
+            "positive_class": self.class_names[self.positive],
+            "confusion_matrix": {
+                "classes": self.class_names,
+                "counts": self.confusion.tolist(),
+            },
+        }
@@ -0,0 +1,196 @@
+import os
+import csv
+import time
+import json
+import random
+import shutil
+import itertools
+import dataclasses
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import SweepConfig, TrainingConfig, DataPreprocessingConfig
+from cnnClassifier.components.data_preprocessing import DataPreprocessing
+
+
+# params.yaml keys a trial can set, with the TrainingConfig field they override;
+# LEARNING_RATE is set on the optimizer of the loaded base model instead
+TRIAL_PARAMS = {
+    "BATCH_SIZE": "params_batch_size",
+    "EPOCHS": "params_epochs",
+    "AUGMENTATION": "params_is_augmentation",
+    "EARLY_STOPPING_PATIENCE": "params_early_stopping_patience",
+    "BOTTLENECK_FEATURES": "params_bottleneck_features",
+    "MIXED_PRECISION": "params_mixed_precision",
+}
+
+
+def _init_trial_process(threads: int):
+    """
+    Limit TensorFlow's thread pools of a trial process; runs before any TensorFlow op.
+    """
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def run_trial(trial_id: str, params: dict, training_config: TrainingConfig, sweep_config: SweepConfig) -> dict:
+    """
+    Train and evaluate the model with one set of params, in a trial process.
+
+    Every trial reads the memory-mapped preprocessed dataset, so the images are
+    decoded once for the whole sweep and their pages are shared between the
+    trial processes. Trials never overwrite the pipeline's artifacts.
+
+    Returns:
+        dict: The trial's params, status, validation loss and accuracy.
+    """
+    import tensorflow as tf
+    from cnnClassifier.components.model_trainer import Training
+    from cnnClassifier.components.training_callbacks import MedianStopping
+
+    tf.keras.backend.clear_session()  # Pool processes run several trials
+    start = time.perf_counter()
+    trial_dir = Path(sweep_config.root_dir) / "trials" / trial_id
+
+    config = dataclasses.replace(
+        training_config,
+        trained_model_path=trial_dir / "model.h5",
+        bottleneck_dir=trial_dir / "bottleneck",
+        checkpoint_dir=trial_dir / "checkpoints",
+        profile_dir=trial_dir / "profile",
+        profile_trace_steps=[0, 0],
+        measure_input_wait=False,  # Profiling only; its Python generator runs outside the capped tf.data pool
+        input_threads=sweep_config.threads_per_trial,
+        cluster_workers=[],
+        params_data_loader="cache",
+        **{TRIAL_PARAMS[key]: value for key, value in params.items() if key in TRIAL_PARAMS}
+    )
+    training = Training(config=config)
+    training.get_base_model()
+    if "LEARNING_RATE" in params:
+        training.model.optimizer.learning_rate.assign(params["LEARNING_RATE"])
+    training.train_valid_generator()
+
+    stopping = MedianStopping(
+        history_dir=Path(sweep_config.root_dir) / "trials" / "history",
+        trial_id=trial_id,
+        min_epochs=sweep_config.prune_after_epochs,
+        min_trials=sweep_config.min_trials_to_prune
+    )
+    training.train(callbacks=[stopping], save=False)
+    loss, accuracy = training.model.evaluate(training.valid_generator, verbose=0)
+
+    with open(config.profile_dir / "summary.json") as f:
+        images_per_second = json.load(f)["images_per_second"]
+
+    return {
+        "trial": trial_id,
+        "status": "pruned" if stopping.pruned else "completed",
+        **params,
+        "epochs_run": len(stopping.history),
+        "loss": loss,
+        "accuracy": accuracy,
+        "images_per_second": images_per_second,
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+
+
+class HyperparameterSweep:
+    """
+    Grid or random search over params.yaml values, trials running in parallel
+    processes with a fixed number of TensorFlow threads each.
+
+    Unpromising trials are pruned with the median stopping rule, and every
+    finished trial is added to `root_dir/results.csv` right away.
+    """
+    def __init__(self, config: SweepConfig, training_config: TrainingConfig,
+                 preprocessing_config: DataPreprocessingConfig):
+        """
+        Initializes the sweep.
+
+        Args:
+            config (SweepConfig): Search space and trial settings.
+            training_config (TrainingConfig): Training settings the trials start from.
+            preprocessing_config (DataPreprocessingConfig): The dataset cache the trials share.
+        """
+        self.config = config
+        self.training_config = training_config
+        self.preprocessing_config = preprocessing_config
+        self.results_path = Path(config.root_dir) / "results.csv"
+
+    def trials(self) -> list:
+        """
+        Every combination of the search space values, or a random sample of
+        `max_trials` of them.
+
+        Returns:
+            list: One dict of params.yaml key to value per trial.
+        """
+        unknown = set(self.config.search_space) - set(TRIAL_PARAMS) - {"LEARNING_RATE"}
+        if unknown:
+            raise ValueError(f"Unsupported sweep params {sorted(unknown)}, expected any of "
+                             f"{sorted(TRIAL_PARAMS) + ['LEARNING_RATE']}")
+
+        keys = list(self.config.search_space)
+        grid = [dict(zip(keys, values)) for values in itertools.product(*self.config.search_space.values())]
+        if 0 < self.config.max_trials < len(grid):
+            grid = random.Random(0).sample(grid, self.config.max_trials)
+        return grid
+
+    def save_results(self, results: list):
+        """
+        Write the results of the trials finished so far to results.csv.
+        """
+        columns = []
+        for result in results:
+            columns.extend(key for key in result if key not in columns)
+        with open(self.results_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(sorted(results, key=lambda result: result["trial"]))
+
+    def run(self) -> list:
+        """
+        Run every trial and return their results.
+        """
+        trials = self.trials()
+
+        # One decoded copy of the dataset for every trial
+        DataPreprocessing(config=self.preprocessing_config).preprocess()
+
+        # Pruning compares trials of this sweep only
+        shutil.rmtree(Path(self.config.root_dir) / "trials", ignore_errors=True)
+
+        threads = self.config.threads_per_trial
+        workers = self.config.max_parallel_trials or max(1, (os.cpu_count() or 1) // threads)
+        logger.info(f"Running {len(trials)} trials, {workers} at a time with {threads} threads each")
+
+        results = []
+        # TensorFlow is not fork-safe, trial processes start from a fresh interpreter
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_trial_process, initargs=(threads,)) as pool:
+            futures = {
+                pool.submit(run_trial, f"trial_{index:03d}", params, self.training_config, self.config): (index, params)
+                for index, params in enumerate(trials)
+            }
+            for future in as_completed(futures):
+                index, params = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.exception(e)
+                    result = {"trial": f"trial_{index:03d}", "status": "failed", **params, "error": str(e)}
+                logger.info(f"{result['trial']} {result['status']}: {params} "
+                            f"loss {result.get('loss', float('nan')):.4f}, accuracy {result.get('accuracy', float('nan')):.4f}")
+                results.append(result)
+                self.save_results(results)
+
+        logger.info(f"Sweep results saved in {self.results_path}")
+        return results
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import subprocess
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import get_file_hash
+from cnnClassifier.entity.config_entity import MlflowTrackingConfig
+
+
+class MlflowTracker:
+    """
+    MLflow logging that never blocks the pipeline.
+
+    `log_run` writes the params, metrics and a copy of the model into a spool
+    directory and starts a detached sync process, so the calling stage ends as
+    soon as the files are written. The sync process uploads every spooled run
+    to the remote tracking server, params and metrics in one batch request per
+    run, and deletes it once uploaded. When the remote is unreachable the run
+    is recorded in a local file-based MLflow store instead (browse it with
+    `mlflow ui --backend-store-uri <local_store>`) and stays in the spool
+    until a later sync reaches the remote. Without a DagsHub token (the
+    DAGSHUB_USER_TOKEN environment variable or a token cached by `dagshub
+    login`) the remote is not contacted at all, since DagsHub would otherwise
+    start an interactive login the detached process cannot answer.
+
+    Spool layout:
+        <run>/run.json: params, metrics, registered model name, SHA-256 of
+            the model, and the local store run id once recorded there;
+            written last, so a half-spooled run is never synced.
+        models/<sha256>.h5: one copy of each spooled model, shared by the runs
+            that log it and removed once none of them is pending.
+    """
+    def __init__(self, config: MlflowTrackingConfig):
+        """
+        Initializes the tracker.
+
+        Args:
+            config (MlflowTrackingConfig): Remote server, spool and local store settings.
+        """
+        self.config = config
+        self.spool_dir = Path(config.spool_dir)
+        self.models_dir = self.spool_dir / "models"
+
+    def log_run(self, params: dict, metrics: dict, model_path: Path = None):
+        """
+        Spool a run and start syncing it in the background.
+
+        A run identical to one still pending (same params, metrics and model)
+        is not spooled again, and each model is copied into the spool once.
+
+        Args:
+            params (dict): Run params; values are logged as strings.
+            metrics (dict): Run metrics, numbers only.
+            model_path (Path, optional): Keras model file logged as the run's model.
+        """
+        record = {
+            "params": {key: str(value) for key, value in params.items()},
+            "metrics": {key: float(value) for key, value in metrics.items()},
+            "registered_model_name": self.config.registered_model_name if model_path is not None else None,
+            "model_sha256": get_file_hash(Path(model_path)) if model_path is not None else None,
+        }
+        for run_dir in self.pending():
+            with open(run_dir / "run.json") as f:
+                pending = json.load(f)
+            if all(pending.get(key) == value for key, value in record.items()):
+                logger.info(f"The same MLflow run is already spooled at {run_dir}")
+                self.start_background_sync()
+                return
+
+        if model_path is not None:
+            model_file = self.models_dir / f"{record['model_sha256']}.h5"
+            if not model_file.exists():
+                # Training rewrites the model file in place, a later run must not change this copy
+                self.models_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = model_file.with_suffix(".tmp")
+                shutil.copyfile(model_path, tmp_path)
+                os.replace(tmp_path, model_file)
+
+        run_dir = self.spool_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        run_dir.mkdir(parents=True)
+        record["timestamp"] = int(time.time() * 1000)
+        self._write_record(run_dir, record)
+        logger.info(f"MLflow run spooled at {run_dir}")
+        self.start_background_sync()
+
+    @staticmethod
+    def _write_record(run_dir: Path, record: dict):
+        tmp_path = run_dir / "run.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f, indent=4)
+        os.replace(tmp_path, run_dir / "run.json")
+
+    def pending(self) -> list:
+        """
+        Spooled runs not uploaded to the remote yet, oldest first.
+        """
+        if not self.spool_dir.is_dir():
+            return []
+        return sorted(path.parent for path in self.spool_dir.glob("*/run.json"))
+
+    def _model_file(self, record: dict) -> Path:
+        return self.models_dir / f"{record['model_sha256']}.h5" if record.get("model_sha256") else None
+
+    def prune_models(self):
+        """
+        Remove the spooled models no pending run logs any more.
+        """
+        if not self.models_dir.is_dir():
+            return
+        used = set()
+        for run_dir in self.pending():
+            with open(run_dir / "run.json") as f:
+                used.add(self._model_file(json.load(f)))
+        for model_file in self.models_dir.glob("*.h5"):
+            if model_file not in used:
+                model_file.unlink()
+
+    def start_background_sync(self):
+        """
+        Start `sync` in a detached process that outlives the caller.
+        """
+        subprocess.Popen(
+            [sys.executable, "-m", "cnnClassifier.components.mlflow_tracking"],
+            cwd=os.getcwd(),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+    def remote_reachable(self) -> bool:
+        """
+        Whether the tracking server answers at all; any HTTP status counts as reachable.
+        """
+        try:
+            request = urllib.request.Request(self.config.tracking_uri, method="HEAD")
+            urllib.request.urlopen(request, timeout=self.config.request_timeout).close()
+        except urllib.error.HTTPError:
+            pass
+        except (urllib.error.URLError, OSError):
+            return False
+        return True
+
+    def _log(self, record: dict, registered_model_name: str = None) -> str:
+        """
+        Log one spooled run to the current tracking URI and return its run id.
+        """
+        import mlflow
+        import mlflow.keras
+        from mlflow.entities import Metric, Param
+        from mlflow.tracking import MlflowClient
+
+        with mlflow.start_run() as run:
+            MlflowClient().log_batch(
+                run.info.run_id,
+                metrics=[Metric(key, value, record["timestamp"], 0) for key, value in record["metrics"].items()],
+                params=[Param(key, value) for key, value in record["params"].items()]
+            )
+            model_file = self._model_file(record)
+            if model_file is not None:
+                import tensorflow as tf
+                model = tf.keras.models.load_model(model_file, compile=False)
+                mlflow.keras.log_model(model, "model", registered_model_name=registered_model_name)
+            return run.info.run_id
+
+    def _log_locally(self, run_dir: Path, record: dict):
+        """
+        Record a run in the local file store, once; it stays spooled for the remote.
+        """
+        import mlflow
+
+        if record.get("local_run_id"):
+            return
+        mlflow.set_tracking_uri(Path(self.config.local_store).resolve().as_uri())
+        record["local_run_id"] = self._log(record)
+        self._write_record(run_dir, record)
+        logger.info(f"MLflow run {run_dir.name} recorded in the local store {self.config.local_store}")
+
+    def sync(self):
+        """
+        Upload every spooled run to the remote, or record it locally when the remote is down.
+
+        Only one sync runs at a time; a sync started while another one runs
+        returns at once, and the running one picks up the newly spooled runs.
+        """
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.spool_dir / ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Another MLflow sync is running")
+                return
+
+            os.environ.setdefault("MLFLOW_HTTP_REQUEST_TIMEOUT", str(self.config.request_timeout))
+            os.environ.setdefault("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "2")
+            remote = None
+            done = set()
+            while True:
+                runs = [run_dir for run_dir in self.pending() if run_dir not in done]
+                if not runs:
+                    break
+                if remote is None:
+                    remote = self._connect()
+                for run_dir in runs:
+                    done.add(run_dir)
+                    with open(run_dir / "run.json") as f:
+                        record = json.load(f)
+                    if remote:
+                        try:
+                            run_id = self._log(record, record["registered_model_name"])
+                            shutil.rmtree(run_dir)
+                            self.prune_models()
+                            logger.info(f"MLflow run {run_dir.name} uploaded as {run_id}")
+                            continue
+                        except Exception as e:
+                            logger.warning(f"Uploading MLflow run {run_dir.name} failed: {e}")
+                            remote = False
+                    try:
+                        self._log_locally(run_dir, record)
+                    except Exception as e:
+                        logger.warning(f"Recording MLflow run {run_dir.name} in the local store failed: {e}")
+
+            left = len(self.pending())
+            if left:
+                logger.info(f"{left} MLflow runs stay spooled in {self.spool_dir} until the remote is reachable")
+
+    def _connect(self) -> bool:
+        """
+        Point MLflow at the remote tracking server, or return False when it is
+        unreachable or no DagsHub token is available.
+        """
+        try:
+            from dagshub.auth import get_token
+            # Raises instead of starting the interactive OAuth login
+            get_token(fail_if_no_token=True)
+        except Exception as e:
+            logger.warning(f"No DagsHub token (set DAGSHUB_USER_TOKEN or run `dagshub login`), "
+                           f"not contacting {self.config.tracking_uri}: {e}")
+            return False
+        if not self.remote_reachable():
+            logger.warning(f"MLflow tracking server {self.config.tracking_uri} is unreachable")
+            return False
+        try:
+            import dagshub
+            import mlflow
+            dagshub.init(repo_owner=self.config.repo_owner, repo_name=self.config.repo_name, mlflow=True)
+            mlflow.set_tracking_uri(self.config.tracking_uri)
+        except Exception as e:
+            logger.warning(f"Connecting to the MLflow tracking server failed: {e}")
+            return False
+        return True
+
+
+if __name__ == "__main__":
+    from cnnClassifier.config.configuration import ConfigurationManager
+
+    MlflowTracker(ConfigurationManager().get_mlflow_tracking_config()).sync()
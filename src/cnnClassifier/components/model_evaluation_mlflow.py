@@ -1,12 +1,14 @@
+import json
 import tensorflow as tf
 from pathlib import Path
-import dagshub
-import mlflow
-import mlflow.keras
-from urllib.parse import urlparse
 
+from cnnClassifier import logger
 from cnnClassifier.entity.config_entity import EvaluationConfig
-from cnnClassifier.utils.common import read_yaml, create_directories,save_json
+from cnnClassifier.components.data_loader import ImageDatasetLoader, CachedDatasetLoader
+from cnnClassifier.components.data_manifest import DataManifest
+from cnnClassifier.components.evaluation_metrics import StreamingMetrics
+from cnnClassifier.components.mlflow_tracking import MlflowTracker
+from cnnClassifier.utils.common import read_yaml, create_directories,save_json, get_file_hash, make_key
 
 
 class Evaluation:
@@ -25,32 +27,55 @@ class Evaluation:
             config (EvaluationConfig): Configuration settings for model evaluation.
         """
         self.config = config
+        self.model = None
+        self.from_cache = False
 
     def _valid_generator(self):
         """
         Creates a validation data generator using Keras' ImageDataGenerator.
 
-        This method sets up the data augmentation and preprocessing steps and
-        creates a flow from the directory specified in the configuration.
+        This method sets up the preprocessing steps and creates a flow over the
+        validation subset of the data manifest, the same images training
+        validates on. With DATA_LOADER "tf_data" or "cache" the subset is read
+        through tf.data, from the images or from the preprocessed arrays.
         """
+        manifest = DataManifest.load(self.config.manifest_file)
+        self.class_names = manifest.class_names
+        loader_kwargs = dict(
+            image_size=self.config.params_image_size,
+            batch_size=self.config.params_batch_size,
+            manifest=manifest
+        )
+        if self.config.params_data_loader == "cache":
+            loader = CachedDatasetLoader(directory=self.config.preprocessed_data, **loader_kwargs)
+            self.valid_generator = loader.dataset(subset="validation", shuffle=False)
+            return
+        if self.config.params_data_loader == "tf_data":
+            loader = ImageDatasetLoader(**loader_kwargs)
+            self.valid_generator = loader.dataset(subset="validation", shuffle=False)
+            return
+
+        import pandas as pd
+
         datagenerator_kwargs = dict(
-            rescale=1./255,
-            validation_split=0.30
+            rescale=1./255
         )
 
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],
             batch_size=self.config.params_batch_size,
-            interpolation="bilinear"
+            interpolation="bilinear",
+            classes=manifest.class_names,
+            validate_filenames=False
         )
 
         valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
             **datagenerator_kwargs
         )
 
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="validation",
+        paths, labels, class_names = manifest.subset("validation")
+        self.valid_generator = valid_datagenerator.flow_from_dataframe(
+            dataframe=pd.DataFrame({"filename": paths, "class": [class_names[label] for label in labels]}),
             shuffle=False,
             **dataflow_kwargs
         )
@@ -68,44 +93,128 @@ class Evaluation:
         """
         return tf.keras.models.load_model(path)
 
-    def evaluation(self):
+    def _batches(self):
+        """
+        Yields (images, one-hot labels) NumPy batches of the validation subset, once each.
+        """
+        if isinstance(self.valid_generator, tf.data.Dataset):
+            for images, labels in self.valid_generator.as_numpy_iterator():
+                yield images, labels
+        else:
+            for index in range(len(self.valid_generator)):
+                yield self.valid_generator[index]
+
+    def cache_key(self) -> str:
+        """
+        Key of the evaluation result: the model file hash, the data manifest
+        fingerprint and every setting that changes the scores.
+        """
+        manifest = DataManifest.load(self.config.manifest_file)
+        return make_key(
+            "evaluation",
+            get_file_hash(Path(self.config.path_of_model)),
+            manifest.fingerprint,
+            self.config.params_image_size,
+            self.config.params_batch_size,
+            self.config.params_data_loader,
+            self.config.positive_class,
+            self.config.roc_bins
+        )
+
+    def _cache_path(self, key: str) -> Path:
+        return Path(self.config.root_dir) / f"scores_{key[:16]}.json"
+
+    def load_cached_score(self, key: str):
+        """
+        Return the scores stored for `key`, or None when there are none.
+        """
+        try:
+            with open(self._cache_path(key)) as f:
+                cached = json.load(f)
+            return cached["scores"] if cached["key"] == key else None
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def evaluation(self, force: bool = False):
         """
         Evaluates the trained model using the validation data generator.
 
-        This method loads the model, sets up the validation data generator,
-        performs evaluation, and saves the evaluation scores.
+        This method loads the model, sets up the validation data generator and
+        makes a single pass over the validation batches. Loss, accuracy,
+        sensitivity, specificity, ROC-AUC and the confusion matrix are all
+        accumulated from that pass, batch by batch.
+
+        The scores are stored under a key of the model, the data and the
+        evaluation params. While the key is unchanged the stored scores are
+        used without loading the model, unless `force` is set. Only the latest
+        scores are kept; those of earlier keys are deleted.
+
+        Args:
+            force (bool): Recompute the scores even when stored ones match.
         """
+        key = self.cache_key()
+        cached = None if force else self.load_cached_score(key)
+        if cached is not None:
+            self.score = cached
+            self.from_cache = True
+            logger.info(f"Model and data unchanged ({key[:12]}), using the stored evaluation scores")
+            return
+
         self.model = self.load_model(self.config.path_of_model)
         self._valid_generator()
-        self.score = self.model.evaluate(self.valid_generator)
-        self.save_score()
+
+        metrics = StreamingMetrics(
+            class_names=self.class_names,
+            positive_class=self.config.positive_class,
+            roc_bins=self.config.roc_bins
+        )
+        for images, labels in self._batches():
+            metrics.update(labels, self.model.predict_on_batch(images))
+        self.score = metrics.result()
+        logger.info(f"Evaluated {self.score['images']} images: loss {self.score['loss']:.4f}, "
+                    f"accuracy {self.score['accuracy']:.4f}, sensitivity {self.score['sensitivity']:.4f}, "
+                    f"specificity {self.score['specificity']:.4f}, ROC-AUC {self.score['roc_auc']:.4f}")
+        save_json(path=self._cache_path(key), data={"key": key, "scores": self.score})
+        self._prune_cached_scores(keep=self._cache_path(key))
+
+    def _prune_cached_scores(self, keep: Path):
+        for path in Path(self.config.root_dir).glob("scores_*.json"):
+            if path != keep:
+                path.unlink()
+                logger.info(f"Removed the outdated evaluation scores {path}")
 
     def save_score(self):
         """
         Saves the evaluation scores to a JSON file.
 
-        This method creates a dictionary of scores and saves it as a JSON file.
+        This method writes every metric of the evaluation, including the
+        confusion matrix, to scores.json.
         """
-        scores = {"loss": self.score[0], "accuracy": self.score[1]}
-        save_json(path=Path("scores.json"), data=scores)
+        save_json(path=Path("scores.json"), data=self.score)
 
-    def log_into_mlflow(self):
+    def metrics(self) -> dict:
         """
-        Logs the evaluation parameters and metrics into MLflow.
+        The scalar metrics of the evaluation, for experiment tracking.
+        """
+        return {key: value for key, value in self.score.items() if isinstance(value, float)}
 
-        This method logs the parameters, evaluation scores, and registers the
-        model in MLflow if applicable.
+    def log_into_mlflow(self, tracker: MlflowTracker):
         """
-        # Initialize DagsHub for MLflow tracking
-        dagshub.init(repo_owner='jagadishmali567', 
-                     repo_name='Production-Ready-Chest-Cancer-Detection-Deep-Learning-Model-MLOps-with-MLflow-DVC-CI-CD-and-AWS', 
-                     mlflow=True)
+        Logs the evaluation parameters and metrics into MLflow.
 
-        with mlflow.start_run():
-            mlflow.log_params(self.config.all_params)
-            mlflow.log_metrics(
-                {"loss": self.score[0], "accuracy": self.score[1]}
-            )
+        The run, with the trained model to register, is handed to `tracker`,
+        which spools it and uploads it in the background; this returns as soon
+        as the run is spooled. Scores reused from the cache were logged by the
+        evaluation that computed them and are not logged again.
 
-            # Register the model
-            mlflow.keras.log_model(self.model, "model", registered_model_name="VGG16Model")
+        Args:
+            tracker (MlflowTracker): Background MLflow logger.
+        """
+        if self.from_cache:
+            logger.info("Scores reused from the cache, not logging another MLflow run")
+            return
+        tracker.log_run(
+            params=dict(self.config.all_params),
+            metrics=self.metrics(),
+            model_path=Path(self.config.path_of_model)
+        )
@@ -4,7 +4,28 @@ from zipfile import ZipFile
 import tensorflow as tf
 import time
 from pathlib import Path
+from cnnClassifier import logger
+from cnnClassifier.utils.common import get_file_hash, make_key
+from cnnClassifier.utils.precision import set_precision_policy, with_precision_policy
+from cnnClassifier.utils.distribution import get_strategy, num_workers, is_chief
 from cnnClassifier.entity.config_entity import TrainingConfig
+from cnnClassifier.components.data_loader import ImageDatasetLoader, CachedDatasetLoader
+from cnnClassifier.components.data_manifest import DataManifest
+from cnnClassifier.components.augmentation import build_augmentation
+from cnnClassifier.components.bottleneck_features import BottleneckFeatureCache, split_at_first_trainable
+from cnnClassifier.components.training_callbacks import (InputTimer, ThroughputProfiler, BestWeightsEarlyStopping,
+                                                        resumable_checkpoints)
+
+
+# Augmentation ranges shared by both input pipelines
+AUGMENTATION_KWARGS = dict(
+    rotation_range=40,  # Rotate images
+    horizontal_flip=True,  # Flip images horizontally
+    width_shift_range=0.2,  # Shift images horizontally
+    height_shift_range=0.2,  # Shift images vertically
+    shear_range=0.2,  # Shear images
+    zoom_range=0.2  # Zoom images
+)
 
 
 class Training:
@@ -17,30 +38,77 @@ class Training:
         """
         self.config = config  # Store the training configuration
 
+        # Single-process unless a cluster is configured; created before any other TensorFlow op
+        self.strategy = get_strategy(
+            workers=self.config.cluster_workers,
+            task_index=self.config.task_index,
+            communication=self.config.communication
+        )
+        self.num_workers = num_workers(self.strategy)
+        self.is_chief = is_chief(self.strategy)
+
+        # BATCH_SIZE is per worker, every step trains on all workers' batches
+        self.global_batch_size = self.config.params_batch_size * self.num_workers
+
+        # The images and their training/validation split, shared with evaluation
+        self.manifest = DataManifest.load(self.config.manifest_file)
+
     def get_base_model(self):
         """
-        Loads the base model from the specified path.
+        Loads the base model from the specified path, under the distribution
+        strategy so that its variables are mirrored on every worker.
         """
-        self.model = tf.keras.models.load_model(
-            self.config.updated_base_model_path
-        )
+        # The saved layers keep their dtype policy, the global one applies to models built here
+        set_precision_policy(self.config.params_mixed_precision)
+
+        with self.strategy.scope():
+            base_model = tf.keras.models.load_model(
+                self.config.updated_base_model_path
+            )
+            self.model = with_precision_policy(base_model, self.config.params_mixed_precision)
+
+            # A rebuilt model needs compiling, and XLA compilation is not saved with the model
+            if self.model is not base_model or self.config.params_jit_compile:
+                self.model.compile(
+                    optimizer=self._fresh_optimizer(base_model),
+                    loss=base_model.loss,
+                    metrics=["accuracy"],
+                    jit_compile=self.config.params_jit_compile
+                )
+
+    @staticmethod
+    def _fresh_optimizer(model: tf.keras.Model) -> tf.keras.optimizers.Optimizer:
+        """
+        A new optimizer with the settings of the model's; an optimizer that has
+        been built only updates the variables of the model it was built for.
+        """
+        return tf.keras.optimizers.deserialize(tf.keras.optimizers.serialize(model.optimizer))
 
     def train_valid_generator(self):
         """
         Creates training and validation data generators with or without augmentation
         based on the configuration parameters.
         """
+        if self.config.params_data_loader in ("tf_data", "cache"):
+            self.train_valid_dataset()
+            return
+        if self.config.params_data_loader != "keras":
+            raise ValueError(f"Unknown DATA_LOADER {self.config.params_data_loader!r}, expected 'tf_data', 'cache' or 'keras'")
+        if self.num_workers > 1:
+            raise ValueError("Multi-worker training needs DATA_LOADER 'tf_data' or 'cache'")
+
         # Common data generator arguments
         datagenerator_kwargs = dict(
-            rescale=1./255,  # Rescale pixel values
-            validation_split=0.20  # Split 20% of data for validation
+            rescale=1./255  # Rescale pixel values
         )
 
         # Arguments for data flow
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],  # Target image size
             batch_size=self.config.params_batch_size,  # Batch size
-            interpolation="bilinear"  # Interpolation method
+            interpolation="bilinear",  # Interpolation method
+            classes=self.manifest.class_names,  # Same label order as the manifest
+            validate_filenames=False  # Listed in the manifest, no need to check every file
         )
 
         # Create validation data generator
@@ -48,10 +116,9 @@ class Training:
             **datagenerator_kwargs
         )
 
-        # Flow validation data from directory
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="validation",
+        # Flow validation data from the manifest's validation subset
+        self.valid_generator = valid_datagenerator.flow_from_dataframe(
+            dataframe=self._subset_dataframe("validation"),
             shuffle=False,
             **dataflow_kwargs
         )
@@ -59,25 +126,143 @@ class Training:
         # Conditional data augmentation
         if self.config.params_is_augmentation:
             train_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
-                rotation_range=40,  # Rotate images
-                horizontal_flip=True,  # Flip images horizontally
-                width_shift_range=0.2,  # Shift images horizontally
-                height_shift_range=0.2,  # Shift images vertically
-                shear_range=0.2,  # Shear images
-                zoom_range=0.2,  # Zoom images
+                **AUGMENTATION_KWARGS,
                 **datagenerator_kwargs
             )
         else:
             train_datagenerator = valid_datagenerator  # Use validation generator if no augmentation
 
-        # Flow training data from directory
-        self.train_generator = train_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="training",
+        # Flow training data from the manifest's training subset
+        self.train_generator = train_datagenerator.flow_from_dataframe(
+            dataframe=self._subset_dataframe("training"),
             shuffle=True,
             **dataflow_kwargs
         )
 
+        self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
+        self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+
+    def _subset_dataframe(self, subset: str):
+        """
+        A subset of the manifest as the "filename" and "class" columns flow_from_dataframe reads.
+        """
+        import pandas as pd
+
+        paths, labels, class_names = self.manifest.subset(subset)
+        return pd.DataFrame({"filename": paths, "class": [class_names[label] for label in labels]})
+
+    def _make_loader(self, batch_size: int = None):
+        """
+        The tf.data loader for DATA_LOADER: the preprocessed arrays for "cache",
+        the image files otherwise. Batches hold `batch_size` images, BATCH_SIZE by default.
+        """
+        loader_kwargs = dict(
+            image_size=self.config.params_image_size,
+            batch_size=batch_size or self.config.params_batch_size,
+            manifest=self.manifest,  # Same split as the ImageDataGenerator pipeline and evaluation
+            threads=self.config.input_threads
+        )
+        if self.config.params_data_loader == "cache":
+            return CachedDatasetLoader(directory=self.config.preprocessed_data, **loader_kwargs)
+        return ImageDatasetLoader(cache=self.config.params_cache_dataset, **loader_kwargs)
+
+    def train_valid_dataset(self):
+        """
+        Creates training and validation tf.data pipelines: parallel decode,
+        batching and prefetch instead of ImageDataGenerator's single Python thread,
+        or memory-mapped reads of the preprocessed arrays with DATA_LOADER "cache".
+        """
+        augment = None
+        if self.config.params_is_augmentation:
+            # One ImageProjectiveTransformV3 resample per batch (RandomAffineTransform), ImageDataGenerator ranges
+            augmentation = build_augmentation(**AUGMENTATION_KWARGS)
+            augment = lambda images: augmentation(images, training=True)
+
+        # Batches of the global size, split between the workers by Keras
+        valid_loader = self._make_loader(batch_size=self.global_batch_size)
+        self.valid_generator = valid_loader.dataset(subset="validation", shuffle=False)
+        self.validation_steps = None
+
+        train_loader = self._make_loader()
+        if self.num_workers == 1:
+            self.train_generator = train_loader.dataset(subset="training", shuffle=True, augment=augment)
+            # A dataset is one epoch long, Keras iterates it to the end
+            self.steps_per_epoch = None
+            return
+
+        # Each worker reads and decodes only its own shard of the images, in
+        # batches of BATCH_SIZE, and every worker runs the same number of steps
+        def train_dataset(context: tf.distribute.InputContext) -> tf.data.Dataset:
+            return train_loader.dataset(
+                subset="training", shuffle=True, augment=augment, repeat=True,
+                shard=(context.num_input_pipelines, context.input_pipeline_id)
+            )
+
+        self.train_generator = train_dataset
+        self.steps_per_epoch = max(1, train_loader.count("training") // self.global_batch_size)
+
+    def _run_key(self, mode: str) -> str:
+        """
+        Identifies a training run, so checkpoints are only resumed by the same
+        run. EPOCHS is left out: a run given more epochs continues.
+        """
+        return make_key(
+            mode,
+            get_file_hash(Path(self.config.updated_base_model_path)),
+            self.config.params_data_loader,
+            self._data_signature(),
+            list(self.config.params_image_size),
+            self.config.params_batch_size,
+            self.config.params_is_augmentation,
+            self.config.params_mixed_precision,
+            self.config.params_early_stopping_patience,
+            self.num_workers
+        )
+
+    def _with_callbacks(self, train_data, mode: str, steps_per_epoch=None, extra_callbacks: list = None) -> tuple:
+        """
+        Attach the throughput profiler, per-epoch checkpoints and early stopping
+        to a training run.
+
+        Args:
+            train_data: Training dataset or Sequence passed to `fit`, or the
+                per-worker dataset function of multi-worker training.
+            mode (str): "full" or "bottleneck", which model is trained.
+            steps_per_epoch (int, optional): Steps per epoch of a Sequence.
+            extra_callbacks (list, optional): Further callbacks of the caller.
+
+        Returns:
+            tuple: (training data for `fit`, callbacks).
+        """
+        input_timer = InputTimer() if self.config.measure_input_wait else None
+        if callable(train_data) and not isinstance(train_data, tf.data.Dataset):
+            dataset_fn = train_data
+            timed = input_timer.wrap if input_timer is not None else (lambda dataset: dataset)
+            train_data = self.strategy.distribute_datasets_from_function(lambda context: timed(dataset_fn(context)))
+        elif input_timer is not None:
+            train_data = input_timer.wrap(train_data, steps_per_epoch)
+
+        callbacks = [
+            ThroughputProfiler(
+                profile_dir=self.config.profile_dir,
+                batch_size=self.config.params_batch_size,
+                input_timer=input_timer,
+                trace_steps=tuple(self.config.profile_trace_steps),
+                num_workers=self.num_workers,
+                save=self.is_chief
+            ),
+            resumable_checkpoints(self.config.checkpoint_dir, self._run_key(mode), chief=self.is_chief)
+        ]
+
+        if self.config.params_early_stopping_patience > 0:
+            # Ends on the best epoch's weights, also when all epochs run
+            callbacks.append(BestWeightsEarlyStopping(
+                monitor="val_loss",
+                patience=self.config.params_early_stopping_patience,
+                verbose=1
+            ))
+        return train_data, callbacks + list(extra_callbacks or [])
+
     @staticmethod
     def save_model(path: Path, model: tf.keras.Model):
         """
@@ -89,27 +274,115 @@ class Training:
         """
         model.save(path)
 
-    def train(self):
+    def train(self, callbacks: list = None, save: bool = True):
         """
         Trains the model using the training and validation generators.
 
-        Steps are calculated based on the number of samples and batch size.
-        The trained model is saved to the specified path.
+        Steps are set by `train_valid_generator` from the number of samples and
+        batch size. The trained model is saved to the specified path, and
+        throughput per epoch to `profile_dir/summary.json`.
+        Each epoch is checkpointed in `checkpoint_dir`; a killed run resumes
+        from its last completed epoch. With EARLY_STOPPING_PATIENCE > 0
+        training stops once val_loss stops improving, and the model ends with
+        the weights of its lowest-val_loss epoch, whether it stopped early or not.
+        With BOTTLENECK_FEATURES only the head is trained, on cached backbone features.
+        With a cluster, only the chief saves the model.
+
+        Args:
+            callbacks (list, optional): Further Keras callbacks for `fit`.
+            save (bool): Save the trained model, False to keep it in memory only.
         """
-        self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
-        self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+        if self.config.params_bottleneck_features:
+            if self.num_workers > 1:
+                logger.warning("BOTTLENECK_FEATURES is single-process only; training the full model on every worker")
+            elif self.config.params_is_augmentation:
+                logger.warning("BOTTLENECK_FEATURES needs AUGMENTATION: False, augmented images change "
+                               "every epoch; training the full model instead")
+            else:
+                self.train_bottleneck(callbacks=callbacks, save=save)
+                return
+
+        train_data, callbacks = self._with_callbacks(self.train_generator, "full", self.steps_per_epoch, callbacks)
 
         # Train the model
         self.model.fit(
-            self.train_generator,
+            train_data,
             epochs=self.config.params_epochs,
             steps_per_epoch=self.steps_per_epoch,
             validation_steps=self.validation_steps,
-            validation_data=self.valid_generator
+            validation_data=self.valid_generator,
+            callbacks=callbacks
+        )
+
+        # Every worker holds the same weights, one copy is enough
+        if save and self.is_chief:
+            self.save_model(
+                path=self.config.trained_model_path,
+                model=self.model
+            )
+
+    def _data_signature(self) -> str:
+        """
+        Identifies the input images and their split: the manifest fingerprint,
+        which covers every file's path, content hash and subset.
+        """
+        return self.manifest.fingerprint
+
+    def train_bottleneck(self, callbacks: list = None, save: bool = True):
+        """
+        Trains only the head of the model on backbone features cached on disk.
+
+        The frozen backbone runs once per image instead of once per image and
+        epoch. The head shares its layers with the full model, so saving the
+        full model afterwards gives the same model.h5 as regular training.
+
+        Args:
+            callbacks (list, optional): Further Keras callbacks for `fit`.
+            save (bool): Save the trained model, False to keep it in memory only.
+        """
+        backbone, head = split_at_first_trainable(self.model)
+        head.compile(
+            optimizer=self._fresh_optimizer(self.model),
+            loss=self.model.loss,
+            metrics=["accuracy"],
+            jit_compile=self.config.params_jit_compile
         )
 
-        # Save the trained model
-        self.save_model(
-            path=self.config.trained_model_path,
-            model=self.model
+        cache = BottleneckFeatureCache(
+            directory=self.config.bottleneck_dir,
+            key=make_key(
+                get_file_hash(Path(self.config.updated_base_model_path)),
+                self.config.params_data_loader,
+                self._data_signature(),
+                list(self.config.params_image_size)
+            )
         )
+
+        # Unshuffled and unaugmented, so each image has exactly one feature vector
+        features = {}
+        for subset in ("training", "validation"):
+            loader = self._make_loader()
+            dataset = loader.dataset(subset=subset, shuffle=False)
+            features[subset] = cache.get(subset, backbone, dataset, loader.samples)
+
+        def feature_dataset(subset: str, shuffle: bool) -> tf.data.Dataset:
+            ds = tf.data.Dataset.from_tensor_slices(features[subset])
+            if shuffle:
+                ds = ds.shuffle(buffer_size=len(features[subset][0]), reshuffle_each_iteration=True)
+            return ds.batch(self.config.params_batch_size).prefetch(tf.data.AUTOTUNE)
+
+        train_data, callbacks = self._with_callbacks(feature_dataset("training", shuffle=True), "bottleneck",
+                                                     extra_callbacks=callbacks)
+        head.fit(
+            train_data,
+            epochs=self.config.params_epochs,
+            validation_data=feature_dataset("validation", shuffle=False),
+            callbacks=callbacks
+        )
+
+        # The head's layers are the full model's layers, already updated
+        if save:
+            self.save_model(
+                path=self.config.trained_model_path,
+                model=self.model
+            )
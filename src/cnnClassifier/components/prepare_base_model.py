@@ -5,6 +5,7 @@ import tensorflow as tf
 from pathlib import Path
 
 from cnnClassifier.entity.config_entity import PrepareBaseModelConfig
+from cnnClassifier.utils.precision import set_precision_policy
 
 
 class PrepareBaseModel:
@@ -35,6 +36,9 @@ class PrepareBaseModel:
         Loads the base model using the VGG16 architecture with the specified parameters
         and saves it to the configured path.
         """
+        # Layers take the global dtype policy when they are built
+        set_precision_policy(self.config.params_mixed_precision)
+
         self.model = tf.keras.applications.vgg16.VGG16(
             input_shape=self.config.params_image_size,
             weights=self.config.params_weights,
@@ -45,7 +49,7 @@ class PrepareBaseModel:
         self.save_model(path=self.config.base_model_path, model=self.model)
 
     @staticmethod
-    def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate):
+    def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate, jit_compile=False):
         """
         Prepares the full model by adding custom layers, setting trainable layers, and compiling.
 
@@ -55,6 +59,7 @@ class PrepareBaseModel:
             freeze_all (bool): Whether to freeze all layers.
             freeze_till (int or None): Number of layers to keep unfrozen from the end.
             learning_rate (float): Learning rate for the optimizer.
+            jit_compile (bool): Whether to compile the training step with XLA.
 
         Returns:
             tf.keras.Model: The fully prepared model with custom layers added.
@@ -69,7 +74,8 @@ class PrepareBaseModel:
         flatten_in = tf.keras.layers.Flatten()(model.output)
         prediction = tf.keras.layers.Dense(
             units=classes,
-            activation="softmax"
+            activation="softmax",
+            dtype="float32"  # Softmax at full precision under a mixed precision policy
         )(flatten_in)
 
         full_model = tf.keras.models.Model(
@@ -80,7 +86,8 @@ class PrepareBaseModel:
         full_model.compile(
             optimizer=tf.keras.optimizers.SGD(learning_rate=learning_rate),
             loss=tf.keras.losses.CategoricalCrossentropy(),
-            metrics=["accuracy"]
+            metrics=["accuracy"],
+            jit_compile=jit_compile
         )
 
         full_model.summary()
@@ -96,7 +103,8 @@ class PrepareBaseModel:
             classes=self.config.params_classes,
             freeze_all=True,
             freeze_till=None,
-            learning_rate=self.config.params_learning_rate
+            learning_rate=self.config.params_learning_rate,
+            jit_compile=self.config.params_jit_compile
         )
 
         # Save the updated full model to the specified path
@@ -0,0 +1,100 @@
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import ServingModelConfig
+
+
+class ServingModule(tf.Module):
+    """
+    Wraps a trained Keras model with the training-time preprocessing so that
+    decode, resize and rescale run inside the TensorFlow graph.
+
+    Signatures:
+        serve_bytes: 1-D string tensor of encoded JPEG/PNG images.
+        serve_uint8: uint8 tensor (N, H, W, 3) of decoded images of any size.
+    Both return {"probabilities": float32 (N, CLASSES)}.
+    """
+    def __init__(self, model: tf.keras.Model, image_size: list):
+        super().__init__()
+        self.model = model
+        self.image_size = tf.constant(image_size[:2], dtype=tf.int32)
+
+    def _resize_and_rescale(self, images: tf.Tensor) -> tf.Tensor:
+        # Same bilinear resize and 1./255 rescale as the ImageDataGenerator used in training
+        images = tf.image.resize(images, self.image_size, method="bilinear", antialias=True)
+        return images * (1. / 255)
+
+    def _decode(self, encoded: tf.Tensor) -> tf.Tensor:
+        image = tf.io.decode_image(encoded, channels=3, expand_animations=False)
+        image.set_shape([None, None, 3])
+        return self._resize_and_rescale(tf.expand_dims(image, 0))[0]
+
+    def _predict(self, images: tf.Tensor) -> dict:
+        probabilities = tf.cast(self.model(images, training=False), tf.float32)
+        return {"probabilities": probabilities}
+
+    @tf.function(input_signature=[tf.TensorSpec(shape=[None], dtype=tf.string, name="images")])
+    def serve_bytes(self, images):
+        decoded = tf.map_fn(
+            self._decode,
+            images,
+            fn_output_signature=tf.TensorSpec(shape=[None, None, 3], dtype=tf.float32),
+            parallel_iterations=16
+        )
+        return self._predict(decoded)
+
+    @tf.function(input_signature=[tf.TensorSpec(shape=[None, None, None, 3], dtype=tf.uint8, name="images")])
+    def serve_uint8(self, images):
+        return self._predict(self._resize_and_rescale(images))
+
+
+class ServingModelExport:
+    """
+    Exports the trained model as a SavedModel with preprocessing built into the graph.
+
+    Attributes:
+        config (ServingModelConfig): Configuration settings for the export.
+    """
+    def __init__(self, config: ServingModelConfig):
+        """
+        Initializes the ServingModelExport with the given configuration.
+
+        Args:
+            config (ServingModelConfig): Configuration settings for the export.
+        """
+        self.config = config
+
+    def load_trained_model(self):
+        """
+        Loads the trained Keras model.
+        """
+        self.model = tf.keras.models.load_model(self.config.trained_model_path, compile=False)
+
+    def export(self):
+        """
+        Wraps the trained model in a ServingModule and saves it with both serving signatures.
+        """
+        module = ServingModule(self.model, self.config.params_image_size)
+        tf.saved_model.save(
+            module,
+            str(self.config.serving_model_path),
+            signatures={
+                "serving_default": module.serve_bytes,
+                "serve_uint8": module.serve_uint8
+            }
+        )
+        logger.info(f"Serving model exported to {self.config.serving_model_path}")
+
+    @staticmethod
+    def load(path: Path):
+        """
+        Loads an exported serving model.
+
+        Args:
+            path (Path): Directory of the exported SavedModel.
+
+        Returns:
+            The restored ServingModule exposing `serve_bytes` and `serve_uint8`.
+        """
+        return tf.saved_model.load(str(path))
@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import save_json
+
+
+class InputTimer:
+    """
+    Measures how long `fit` waits for each training batch.
+
+    `wrap` hands Keras a dataset that pulls batches from the real input
+    pipeline inside the training step and times every pull. The real
+    pipeline keeps prefetching in the background, so the measured time is
+    the part of the step spent blocked on input rather than on compute.
+    """
+    def __init__(self):
+        self.wait_seconds = 0.0
+        self.batches = 0
+        self.images = 0
+
+    def take(self) -> tuple:
+        """
+        Return and reset the (wait seconds, batches, images) recorded so far.
+        """
+        recorded = (self.wait_seconds, self.batches, self.images)
+        self.wait_seconds, self.batches, self.images = 0.0, 0, 0
+        return recorded
+
+    def _timed(self, iterator):
+        while True:
+            start = time.perf_counter()
+            try:
+                images, labels = next(iterator)
+            except StopIteration:
+                return
+            self.wait_seconds += time.perf_counter() - start
+            self.batches += 1
+            self.images += len(images)
+            yield images, labels
+
+    def wrap(self, data, steps_per_epoch=None) -> tf.data.Dataset:
+        """
+        Wrap a tf.data dataset or a Keras Sequence (e.g. flow_from_directory).
+
+        Args:
+            data: The training data passed to `fit`.
+            steps_per_epoch (int, optional): Set for a Sequence; the wrapped
+                Sequence then repeats and `fit` ends each epoch by step count.
+
+        Returns:
+            tf.data.Dataset: Yields the same batches as `data`.
+        """
+        if isinstance(data, tf.data.Dataset):
+            cardinality = int(data.cardinality())
+            wrapped = tf.data.Dataset.from_generator(lambda: self._timed(iter(data)), output_signature=data.element_spec)
+            if cardinality >= 0:
+                wrapped = wrapped.apply(tf.data.experimental.assert_cardinality(cardinality))
+            return self._unprefetched(wrapped)
+
+        def repeat_sequence():
+            while True:
+                for index in range(len(data)):
+                    yield data[index]
+                data.on_epoch_end()
+
+        images, labels = data[0]
+        signature = (
+            tf.TensorSpec(shape=(None,) + images.shape[1:], dtype=tf.as_dtype(images.dtype)),
+            tf.TensorSpec(shape=(None,) + labels.shape[1:], dtype=tf.as_dtype(labels.dtype)),
+        )
+        return self._unprefetched(
+            tf.data.Dataset.from_generator(lambda: self._timed(repeat_sequence()), output_signature=signature)
+        )
+
+    @staticmethod
+    def _unprefetched(dataset: tf.data.Dataset) -> tf.data.Dataset:
+        # A prefetch tf.data adds on its own would pull batches outside the step
+        options = tf.data.Options()
+        options.experimental_optimization.inject_prefetch = False
+        return dataset.with_options(options)
+
+
+class ThroughputProfiler(tf.keras.callbacks.Callback):
+    """
+    Records training throughput and where step time goes.
+
+    Per epoch: images/sec (of all workers), step time (mean, p50, p95) and, with an
+    InputTimer, the share of step time spent waiting for input. Optionally
+    captures a TensorFlow profiler trace for a range of training steps
+    (viewable in TensorBoard's Profile tab). Results are written to
+    `profile_dir/summary.json` when training ends.
+    """
+    def __init__(self, profile_dir: Path, batch_size: int, input_timer: InputTimer = None,
+                 trace_steps: tuple = (0, 0), num_workers: int = 1, save: bool = True):
+        """
+        Initializes the callback.
+
+        Args:
+            profile_dir (Path): Directory for summary.json and the profiler trace.
+            batch_size (int): Images per batch, used when no InputTimer counts them.
+            input_timer (InputTimer, optional): Timer wrapping the training data.
+            trace_steps (tuple): First and last global training step to trace, (0, 0) disables tracing.
+            num_workers (int): Workers training in step with this one; images/s counts all of them.
+            save (bool): Write summary.json and the trace, False on all workers but the chief.
+        """
+        super().__init__()
+        self.profile_dir = Path(profile_dir)
+        self.batch_size = batch_size
+        self.input_timer = input_timer
+        self.trace_first, self.trace_last = trace_steps if save else (0, 0)
+        self.num_workers = num_workers
+        self.save = save
+        self.tracing = False
+        self.epochs = []
+
+    def on_train_begin(self, logs=None):
+        self.global_step = 0
+        if self.save:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.step_times = []
+        if self.input_timer is not None:
+            self.input_timer.take()
+        self.epoch_start = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_last > 0 and self.global_step == self.trace_first and not self.tracing:
+            tf.profiler.experimental.start(str(self.profile_dir / "trace"))
+            self.tracing = True
+        self.step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step_times.append(time.perf_counter() - self.step_start)
+        if self.tracing and self.global_step >= self.trace_last:
+            self._stop_trace()
+        self.global_step += 1
+
+    def _stop_trace(self):
+        tf.profiler.experimental.stop()
+        self.tracing = False
+        logger.info(f"Profiler trace of steps {self.trace_first}-{self.trace_last} saved in {self.profile_dir / 'trace'}")
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self.epoch_start
+        steps = len(self.step_times)
+        step_seconds = float(np.sum(self.step_times))
+        if self.input_timer is not None:
+            wait_seconds, _, images = self.input_timer.take()
+        else:
+            wait_seconds, images = None, steps * self.batch_size
+        # Every worker trains on its own batches of the same size
+        images *= self.num_workers
+
+        stats = {
+            "epoch": epoch + 1,
+            "seconds": round(seconds, 3),
+            "steps": steps,
+            "images": images,
+            "step_seconds": round(step_seconds, 3),
+            # Training steps only, validation excluded
+            "images_per_second": round(images / step_seconds, 2) if step_seconds else 0.0,
+            "step_ms_mean": round(1e3 * step_seconds / steps, 2) if steps else 0.0,
+            "step_ms_p50": round(1e3 * float(np.percentile(self.step_times, 50)), 2) if steps else 0.0,
+            "step_ms_p95": round(1e3 * float(np.percentile(self.step_times, 95)), 2) if steps else 0.0,
+        }
+        if wait_seconds is not None:
+            stats["input_wait_seconds"] = round(wait_seconds, 3)
+            stats["compute_seconds"] = round(step_seconds - wait_seconds, 3)
+            stats["input_wait_fraction"] = round(wait_seconds / step_seconds, 4) if step_seconds else 0.0
+        self.epochs.append(stats)
+
+        wait = f", {100 * stats['input_wait_fraction']:.1f}% waiting for input" if wait_seconds is not None else ""
+        logger.info(f"Epoch {epoch + 1}: {stats['images_per_second']} images/s, "
+                    f"{stats['step_ms_mean']} ms/step{wait}")
+
+    def on_train_end(self, logs=None):
+        if self.tracing:
+            self._stop_trace()
+        if self.save:
+            self.save_summary()
+
+    def summary(self) -> dict:
+        """
+        Throughput summary over all epochs but the first, which includes tracing
+        and compilation, unless there is only one.
+        """
+        measured = self.epochs[1:] or self.epochs
+        images = sum(epoch["images"] for epoch in measured)
+        step_seconds = sum(epoch["step_seconds"] for epoch in measured)
+
+        summary = {
+            "workers": self.num_workers,
+            "images_per_second": round(images / step_seconds, 2) if step_seconds else 0.0,
+            "step_ms_mean": round(1e3 * step_seconds / max(1, sum(epoch["steps"] for epoch in measured)), 2),
+        }
+        if measured and "input_wait_seconds" in measured[0]:
+            wait_seconds = sum(epoch["input_wait_seconds"] for epoch in measured)
+            summary["input_wait_fraction"] = round(wait_seconds / step_seconds, 4) if step_seconds else 0.0
+        summary["epochs"] = {f"epoch_{epoch['epoch']}": epoch for epoch in self.epochs}
+        return summary
+
+    def save_summary(self):
+        """
+        Write the summary to `profile_dir/summary.json`.
+        """
+        save_json(path=self.profile_dir / "summary.json", data=self.summary())
+
+
+class BestWeightsEarlyStopping(tf.keras.callbacks.EarlyStopping):
+    """
+    EarlyStopping that always leaves the model with the weights of its best epoch.
+
+    Keras restores the best weights only when it stops training itself; a run
+    that uses all its epochs, or that another callback stops, would keep the
+    weights of the last epoch.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(restore_best_weights=True, **kwargs)
+
+    def on_train_end(self, logs=None):
+        if self.stopped_epoch == 0 and self.best_weights is not None:
+            logger.info(f"Restoring the weights of the best epoch, {self.best_epoch + 1}")
+            self.model.set_weights(self.best_weights)
+        super().on_train_end(logs)
+
+
+class MedianStopping(tf.keras.callbacks.Callback):
+    """
+    Median stopping rule for trials running in parallel processes.
+
+    After every epoch the trial appends its monitored value to
+    `history_dir/<trial_id>.json` and compares it with the values the other
+    trials reached at the same epoch. From `min_epochs` on, a trial worse than
+    their median is stopped, as soon as `min_trials` others got that far.
+    """
+    def __init__(self, history_dir: Path, trial_id: str, min_epochs: int = 1, min_trials: int = 3,
+                 monitor: str = "val_loss"):
+        """
+        Initializes the callback.
+
+        Args:
+            history_dir (Path): Directory shared by all trials of a sweep.
+            trial_id (str): Name of this trial's history file.
+            min_epochs (int): First epoch (1-based) at which the trial can be stopped.
+            min_trials (int): Other trials that must have reached an epoch to compare with.
+            monitor (str): Metric to compare, lower is better.
+        """
+        super().__init__()
+        self.history_dir = Path(history_dir)
+        self.trial_id = trial_id
+        self.min_epochs = min_epochs
+        self.min_trials = min_trials
+        self.monitor = monitor
+        self.history = []
+        self.pruned = False
+        os.makedirs(self.history_dir, exist_ok=True)
+
+    def _others(self, epoch: int) -> list:
+        values = []
+        for name in os.listdir(self.history_dir):
+            if not name.endswith(".json") or name == f"{self.trial_id}.json":
+                continue
+            try:
+                with open(self.history_dir / name) as f:
+                    history = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            if len(history) > epoch:
+                values.append(history[epoch])
+        return values
+
+    def on_epoch_end(self, epoch, logs=None):
+        value = float((logs or {})[self.monitor])
+        self.history.append(value)
+        path = self.history_dir / f"{self.trial_id}.json"
+        with open(path.with_suffix(".tmp"), "w") as f:
+            json.dump(self.history, f)
+        os.replace(path.with_suffix(".tmp"), path)
+
+        others = self._others(epoch)
+        if epoch + 1 < self.min_epochs or len(others) < self.min_trials:
+            return
+        median = float(np.median(others))
+        if value > median:
+            logger.info(f"Pruning trial {self.trial_id} after epoch {epoch + 1}: "
+                        f"{self.monitor} {value:.4f} above the median {median:.4f} of {len(others)} trials")
+            self.pruned = True
+            self.model.stop_training = True
+
+
+def resumable_checkpoints(checkpoint_dir: Path, key: str, chief: bool = True) -> tf.keras.callbacks.BackupAndRestore:
+    """
+    Per-epoch checkpoints of the weights, optimizer state and epoch counter.
+
+    A run killed partway resumes from the end of its last completed epoch when
+    `fit` is called again with this callback; the checkpoints are deleted once
+    training finishes. `key` identifies the run (base model, data and
+    parameters): checkpoints left by a run with another key are discarded
+    instead of being resumed. In a cluster only the chief discards them, so
+    workers sharing the directory do not delete it under each other.
+
+    Args:
+        checkpoint_dir (Path): Directory of the checkpoints.
+        key (str): Identifies the training run.
+        chief (bool): Whether this process manages the directory.
+
+    Returns:
+        tf.keras.callbacks.BackupAndRestore: The callback to pass to `fit`.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    run_path = checkpoint_dir / "run.json"
+    has_checkpoints = checkpoint_dir.exists() and any(name != "run.json" for name in os.listdir(checkpoint_dir))
+    try:
+        with open(run_path) as f:
+            resumable = json.load(f)["key"] == key
+    except (FileNotFoundError, KeyError, ValueError):
+        resumable = False
+
+    if not resumable and chief:
+        if has_checkpoints:
+            logger.info(f"Discarding checkpoints of a different training run in {checkpoint_dir}")
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        with open(run_path, "w") as f:
+            json.dump({"key": key}, f, indent=4)
+    elif resumable and has_checkpoints:
+        logger.info(f"Resuming training from the last checkpoint in {checkpoint_dir}")
+
+    return tf.keras.callbacks.BackupAndRestore(backup_dir=str(checkpoint_dir))
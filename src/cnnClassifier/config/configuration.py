@@ -2,9 +2,16 @@ import os
 from cnnClassifier.constants import *
 from cnnClassifier.utils.common import read_yaml, create_directories, save_json
 from cnnClassifier.entity.config_entity import (DataIngestionConfig,
+                                                DataPreprocessingConfig,
                                                 PrepareBaseModelConfig,
                                                 TrainingConfig,
-                                                EvaluationConfig)
+                                                EvaluationConfig,
+                                                ServingModelConfig,
+                                                TrainingJobConfig,
+                                                PredictionConfig,
+                                                ServerConfig,
+                                                SweepConfig,
+                                                MlflowTrackingConfig)
 
 class ConfigurationManager:
     def __init__(
@@ -25,13 +32,43 @@ class ConfigurationManager:
         create_directories([config.root_dir])
 
         data_ingestion_config = DataIngestionConfig(
-            root_dir=config.root_dir,
+            root_dir=Path(config.root_dir),
             source_URL=config.source_URL,
-            local_data_file=config.local_data_file,
-            unzip_dir=config.unzip_dir 
+            local_data_file=Path(config.local_data_file),
+            unzip_dir=Path(config.unzip_dir),
+            data_dir=Path(config.data_dir),
+            manifest_file=Path(config.manifest_file),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            expected_sha256=config.expected_sha256,
+            sha256_file=Path(config.sha256_file),
+            download_workers=config.download_workers,
+            download_chunk_mb=config.download_chunk_mb,
+            download_timeout=config.download_timeout,
+            extract_images=config.extract_images,
+            extract_workers=config.extract_workers
         )
 
         return data_ingestion_config
+
+
+    def get_data_preprocessing_config(self) -> DataPreprocessingConfig:
+        """
+        Retrieves the configuration for the decoded and resized dataset cache.
+
+        Returns:
+            DataPreprocessingConfig: An instance of DataPreprocessingConfig with the specified settings.
+        """
+        config = self.config.data_preprocessing
+
+        create_directories([config.root_dir])
+
+        data_preprocessing_config = DataPreprocessingConfig(
+            root_dir=Path(config.root_dir),  # Where the cached arrays are written
+            manifest_file=Path(self.config.data_ingestion.manifest_file),  # Ingested images and their hashes
+            num_workers=config.num_workers,  # Decode threads
+            params_image_size=self.params.IMAGE_SIZE  # Image size parameter
+        )
+        return data_preprocessing_config
     
     
     def get_prepare_base_model_config(self) -> PrepareBaseModelConfig:
@@ -58,7 +95,9 @@ class ConfigurationManager:
             params_learning_rate=self.params.LEARNING_RATE,
             params_include_top=self.params.INCLUDE_TOP,
             params_weights=self.params.WEIGHTS,
-            params_classes=self.params.CLASSES
+            params_classes=self.params.CLASSES,
+            params_mixed_precision=self.params.MIXED_PRECISION,
+            params_jit_compile=self.params.JIT_COMPILE
         )
 
         return prepare_base_model_config
@@ -73,6 +112,7 @@ class ConfigurationManager:
         """
         training = self.config.training  # Retrieve training configuration
         prepare_base_model = self.config.prepare_base_model  # Retrieve base model preparation configuration
+        distributed = self.config.distributed  # Retrieve the multi-worker cluster
         params = self.params  # Retrieve training parameters
 
         # Construct the path to the training data
@@ -87,10 +127,27 @@ class ConfigurationManager:
             trained_model_path=Path(training.trained_model_path),
             updated_base_model_path=Path(prepare_base_model.updated_base_model_path),
             training_data=Path(training_data),
+            manifest_file=Path(self.config.data_ingestion.manifest_file),
+            preprocessed_data=Path(self.config.data_preprocessing.root_dir),
+            bottleneck_dir=Path(training.bottleneck_dir),
+            checkpoint_dir=Path(training.checkpoint_dir),
+            profile_dir=Path(training.profile_dir),
+            measure_input_wait=training.measure_input_wait,
+            profile_trace_steps=list(training.profile_trace_steps),
+            input_threads=training.input_threads,
+            cluster_workers=list(distributed.workers),
+            task_index=distributed.task_index,
+            communication=distributed.communication,
             params_epochs=params.EPOCHS,
             params_batch_size=params.BATCH_SIZE,
+            params_early_stopping_patience=params.EARLY_STOPPING_PATIENCE,
             params_is_augmentation=params.AUGMENTATION,
-            params_image_size=params.IMAGE_SIZE
+            params_image_size=params.IMAGE_SIZE,
+            params_data_loader=params.DATA_LOADER,
+            params_cache_dataset=params.CACHE_DATASET,
+            params_bottleneck_features=params.BOTTLENECK_FEATURES,
+            params_mixed_precision=params.MIXED_PRECISION,
+            params_jit_compile=params.JIT_COMPILE
         )
 
         return training_config
@@ -103,12 +160,152 @@ class ConfigurationManager:
         Returns:
             EvaluationConfig: An instance of EvaluationConfig with the specified settings.
         """
+        create_directories([self.config.evaluation.root_dir])  # Stored scores
+
         eval_config = EvaluationConfig(
             path_of_model="artifacts/training/model.h5",  # Path to the trained model
             training_data="artifacts/data_ingestion/Chest-CT-Scan-data",  # Path to the training data
-            mlflow_uri="https://dagshub.com/jagadishmali567/Production-Ready-Chest-Cancer-Detection-Deep-Learning-Model-MLOps-with-MLflow-DVC-CI-CD-and-AWS.mlflow",  # MLflow tracking URI
+            mlflow_uri=self.config.mlflow_tracking.tracking_uri,  # MLflow tracking URI
             all_params=self.params,  # Parameters from the parameters YAML file
             params_image_size=self.params.IMAGE_SIZE,  # Image size parameter
-            params_batch_size=self.params.BATCH_SIZE  # Batch size parameter
+            params_batch_size=self.params.BATCH_SIZE,  # Batch size parameter
+            preprocessed_data=Path(self.config.data_preprocessing.root_dir),  # Decoded and resized dataset cache
+            params_data_loader=self.params.DATA_LOADER,  # Input pipeline
+            manifest_file=Path(self.config.data_ingestion.manifest_file),  # Images and their training/validation split
+            positive_class=self.config.evaluation.positive_class,  # Class sensitivity and ROC-AUC refer to
+            roc_bins=self.config.evaluation.roc_bins,  # Resolution of the streaming ROC-AUC
+            root_dir=Path(self.config.evaluation.root_dir)  # Stored scores by model and data
+        )
+        return eval_config
+
+    def get_mlflow_tracking_config(self) -> MlflowTrackingConfig:
+        """
+        Retrieves the background MLflow logging configuration.
+
+        Returns:
+            MlflowTrackingConfig: Remote server, spool and local store settings.
+        """
+        config = self.config.mlflow_tracking
+
+        mlflow_tracking_config = MlflowTrackingConfig(
+            enabled=config.enabled,  # Log evaluation runs at all
+            tracking_uri=config.tracking_uri,  # Remote tracking server
+            repo_owner=config.repo_owner,  # DagsHub repository of the server
+            repo_name=config.repo_name,
+            registered_model_name=config.registered_model_name,  # Model registry name
+            spool_dir=Path(config.spool_dir),  # Runs waiting for upload
+            local_store=Path(config.local_store),  # Fallback file store while offline
+            request_timeout=config.request_timeout  # Seconds per request to the server
+        )
+        return mlflow_tracking_config
+
+
+    def get_serving_model_config(self) -> ServingModelConfig:
+        """
+        Retrieves the configuration for exporting the serving model.
+
+        Returns:
+            ServingModelConfig: An instance of ServingModelConfig with the specified settings.
+        """
+        config = self.config.serving_model
+
+        create_directories([config.root_dir])
+
+        serving_model_config = ServingModelConfig(
+            root_dir=Path(config.root_dir),
+            trained_model_path=Path(config.trained_model_path),
+            serving_model_path=Path(config.serving_model_path),
+            params_image_size=self.params.IMAGE_SIZE
+        )
+        return serving_model_config
+
+
+    def get_training_job_config(self) -> TrainingJobConfig:
+        """
+        Retrieves the configuration for background training jobs.
+
+        Returns:
+            TrainingJobConfig: An instance of TrainingJobConfig with the specified settings.
+        """
+        config = self.config.training_job
+
+        create_directories([config.root_dir])
+
+        training_job_config = TrainingJobConfig(
+            root_dir=Path(config.root_dir),
+            command=config.command,
+            max_log_lines=config.max_log_lines
+        )
+        return training_job_config
+
+
+    def get_prediction_config(self) -> PredictionConfig:
+        """
+        Retrieves the prediction (serving) configuration.
+
+        Returns:
+            PredictionConfig: An instance of PredictionConfig with the specified settings.
+        """
+        config = self.config.prediction
+
+        prediction_config = PredictionConfig(
+            model_path=Path(config.model_path),  # Path to the served model
+            reload_interval=float(config.reload_interval),  # Seconds between model file checks
+            micro_batching=config.micro_batching,  # Batch concurrent requests together
+            max_batch_size=config.max_batch_size,  # Upper bound on a micro-batch
+            max_wait_ms=float(config.max_wait_ms),  # Upper bound on batching delay
+            batch_chunk_size=config.batch_chunk_size,  # Chunk size for bulk predictions
+            max_zip_members=config.max_zip_members,  # File count bound of a zip upload
+            max_zip_member_bytes=config.max_zip_member_bytes,  # Uncompressed size bound of one zipped file
+            cache_enabled=config.cache_enabled,  # Cache results by decoded pixels
+            cache_max_entries=config.cache_max_entries,  # Entry bound of the cache
+            cache_max_bytes=config.cache_max_bytes,  # Size bound of the cache
+            cache_ttl_seconds=float(config.cache_ttl_seconds),  # Lifetime of a cached result
+            params_image_size=self.params.IMAGE_SIZE,  # Image size parameter
+            params_mixed_precision=self.params.MIXED_PRECISION,  # Dtype policy for Keras models
+            params_jit_compile=self.params.JIT_COMPILE  # XLA-compiled inference
+        )
+        return prediction_config
+
+
+    def get_server_config(self) -> ServerConfig:
+        """
+        Retrieves the configuration for the pre-fork production server.
+
+        Returns:
+            ServerConfig: An instance of ServerConfig with the specified settings.
+        """
+        config = self.config.server
+
+        server_config = ServerConfig(
+            bind=config.bind,  # Listen address
+            workers=config.workers,  # Worker processes
+            threads=config.threads,  # Request threads per worker
+            timeout=config.timeout,  # Worker timeout in seconds
+            intra_op_threads=config.intra_op_threads,  # TensorFlow intra-op threads per worker
+            inter_op_threads=config.inter_op_threads  # TensorFlow inter-op threads per worker
+        )
+        return server_config
+
+
+    def get_sweep_config(self) -> SweepConfig:
+        """
+        Retrieves the configuration for hyperparameter sweeps.
+
+        Returns:
+            SweepConfig: An instance of SweepConfig with the search space and trial settings.
+        """
+        config = self.config.sweep
+
+        create_directories([Path(config.root_dir)])
+
+        sweep_config = SweepConfig(
+            root_dir=Path(config.root_dir),
+            threads_per_trial=config.threads_per_trial,  # TensorFlow threads per trial process
+            max_parallel_trials=config.max_parallel_trials,  # Trials at once, 0 fills the cores
+            max_trials=config.max_trials,  # Random sample of the grid, 0 runs all of it
+            prune_after_epochs=config.prune_after_epochs,  # Median stopping starts at this epoch
+            min_trials_to_prune=config.min_trials_to_prune,  # Trials needed at an epoch to prune
+            search_space={key: list(values) for key, values in config.search_space.items()}  # params.yaml key -> values to try
         )
-        return eval_config
\ No newline at end of file
+        return sweep_config
@@ -7,6 +7,33 @@ class DataIngestionConfig:
     source_URL: str
     local_data_file: Path
     unzip_dir: Path
+    data_dir: Path
+    manifest_file: Path
+    params_validation_split: float
+    expected_sha256: str
+    sha256_file: Path
+    download_workers: int
+    download_chunk_mb: int
+    download_timeout: int
+    extract_images: bool
+    extract_workers: int
+
+
+@dataclass(frozen=True)
+class DataPreprocessingConfig:
+    """
+    Configuration for the decoded and resized dataset cache.
+
+    Attributes:
+        root_dir (Path): Directory holding the cached arrays and their metadata.
+        manifest_file (Path): Data manifest listing the images to cache.
+        num_workers (int): Threads decoding images, 0 for one per core.
+        params_image_size (list): Size the images are resized to.
+    """
+    root_dir: Path
+    manifest_file: Path
+    num_workers: int
+    params_image_size: list
     
     
 @dataclass(frozen=True)
@@ -21,6 +48,8 @@ class PrepareBaseModelConfig:
         params_include_top (bool): Whether to include the top layers of the model.
         params_weights (str): Weights to be used for the model.
         params_classes (int): Number of output classes for the model.
+        params_mixed_precision (str): Keras dtype policy the model is built with.
+        params_jit_compile (bool): Whether training steps are compiled with XLA.
     """
     root_dir: Path
     base_model_path: Path
@@ -30,6 +59,8 @@ class PrepareBaseModelConfig:
     params_include_top: bool
     params_weights: str
     params_classes: int
+    params_mixed_precision: str
+    params_jit_compile: bool
     
     
 @dataclass(frozen=True)
@@ -42,19 +73,53 @@ class TrainingConfig:
         trained_model_path (Path): Path to the trained model.
         updated_base_model_path (Path): Path to the updated base model.
         training_data (Path): Path to the training data.
+        manifest_file (Path): Data manifest with the images and their training/validation split.
         params_epochs (int): Number of training epochs.
         params_batch_size (int): Size of each training batch.
+        params_early_stopping_patience (int): Epochs without val_loss improvement before stopping, 0 disables.
         params_is_augmentation (bool): Indicates if data augmentation is applied.
         params_image_size (list): Size of the images used for training.
+        preprocessed_data (Path): Directory of the decoded and resized dataset cache.
+        bottleneck_dir (Path): Directory of the cached backbone features.
+        checkpoint_dir (Path): Directory of the per-epoch checkpoints of an unfinished run.
+        profile_dir (Path): Directory of the throughput summary and profiler trace.
+        measure_input_wait (bool): Whether the time spent waiting for input is measured.
+        profile_trace_steps (list): First and last training step of the profiler trace, [0, 0] for none.
+        input_threads (int): Threads of each tf.data pipeline's private pool, 0 for TensorFlow's shared pool.
+        cluster_workers (list): "host:port" of every multi-worker training process, empty for one process.
+        task_index (int): Position of this process in cluster_workers.
+        communication (str): All-reduce implementation between workers, "auto" or "ring".
+        params_data_loader (str): Input pipeline, "tf_data", "cache" (preprocessed arrays) or "keras" (ImageDataGenerator).
+        params_cache_dataset (bool): Keep decoded images in memory (tf_data only).
+        params_bottleneck_features (bool): Train only the head, on backbone features computed once.
+        params_mixed_precision (str): Keras dtype policy used for training.
+        params_jit_compile (bool): Whether training steps are compiled with XLA.
     """
     root_dir: Path
     trained_model_path: Path
     updated_base_model_path: Path
     training_data: Path
+    manifest_file: Path
+    preprocessed_data: Path
+    bottleneck_dir: Path
+    checkpoint_dir: Path
+    profile_dir: Path
+    measure_input_wait: bool
+    profile_trace_steps: list
+    input_threads: int
+    cluster_workers: list
+    task_index: int
+    communication: str
     params_epochs: int
     params_batch_size: int
+    params_early_stopping_patience: int
     params_is_augmentation: bool
     params_image_size: list
+    params_data_loader: str
+    params_cache_dataset: bool
+    params_bottleneck_features: bool
+    params_mixed_precision: str
+    params_jit_compile: bool
 
 
 @dataclass(frozen=True)
@@ -69,10 +134,160 @@ class EvaluationConfig:
         mlflow_uri (str): URI for MLflow tracking server to log experiments and results.
         params_image_size (list): List containing the dimensions of the input images.
         params_batch_size (int): Size of the batches for evaluation.
+        preprocessed_data (Path): Directory of the decoded and resized dataset cache.
+        params_data_loader (str): Input pipeline, "tf_data", "cache" or "keras".
+        manifest_file (Path): Data manifest with the images and their training/validation split.
+        positive_class (str): Class counted as positive for sensitivity, specificity and ROC-AUC.
+        roc_bins (int): Probability bins of the histograms ROC-AUC is computed from.
+        root_dir (Path): Directory of the stored scores, one file per model, data and params key.
     """
     path_of_model: Path
     training_data: Path
     all_params: dict
     mlflow_uri: str
     params_image_size: list
-    params_batch_size: int
\ No newline at end of file
+    params_batch_size: int
+    preprocessed_data: Path
+    params_data_loader: str
+    manifest_file: Path
+    positive_class: str
+    roc_bins: int
+    root_dir: Path
+
+@dataclass(frozen=True)
+class MlflowTrackingConfig:
+    """
+    Data class to hold configuration settings for background MLflow logging.
+
+    Attributes:
+        enabled (bool): Whether the evaluation stage logs its run to MLflow.
+        tracking_uri (str): URI of the remote MLflow tracking server.
+        repo_owner (str): DagsHub owner of the tracking repository.
+        repo_name (str): DagsHub repository hosting the tracking server.
+        registered_model_name (str): Model registry name of the logged models.
+        spool_dir (Path): Directory of the runs waiting to be uploaded.
+        local_store (Path): File-based MLflow store runs are recorded in while the remote is unreachable.
+        request_timeout (int): Seconds before a request to the tracking server is abandoned.
+    """
+    enabled: bool
+    tracking_uri: str
+    repo_owner: str
+    repo_name: str
+    registered_model_name: str
+    spool_dir: Path
+    local_store: Path
+    request_timeout: int
+
+@dataclass(frozen=True)
+class ServingModelConfig:
+    """
+    Data class to hold configuration settings for exporting the serving model.
+
+    Attributes:
+        root_dir (Path): Directory for the exported serving model.
+        trained_model_path (Path): Path to the trained Keras model.
+        serving_model_path (Path): Directory of the exported SavedModel.
+        params_image_size (list): List containing the dimensions of the input images.
+    """
+    root_dir: Path
+    trained_model_path: Path
+    serving_model_path: Path
+    params_image_size: list
+
+
+@dataclass(frozen=True)
+class TrainingJobConfig:
+    """
+    Data class to hold configuration settings for background training jobs.
+
+    Attributes:
+        root_dir (Path): Directory holding job state files and the run lock.
+        command (str): Command that runs the training DAG.
+        max_log_lines (int): Number of trailing log lines kept per job.
+    """
+    root_dir: Path
+    command: str
+    max_log_lines: int
+
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    """
+    Data class to hold configuration settings for serving predictions.
+
+    Attributes:
+        model_path (Path): Path to the served model, a Keras .h5 file or an exported serving model directory.
+        reload_interval (float): Seconds between checks of the model file for changes, 0 disables hot reload.
+        micro_batching (bool): Whether concurrent requests are batched into one forward pass.
+        max_batch_size (int): Largest batch collected by the micro-batcher.
+        max_wait_ms (float): Longest time a request waits for a batch to fill, in milliseconds.
+        batch_chunk_size (int): Number of images per forward pass for bulk predictions.
+        max_zip_members (int): Largest number of files in a zip uploaded for bulk predictions.
+        max_zip_member_bytes (int): Largest uncompressed size of one file in such a zip.
+        cache_enabled (bool): Whether prediction results are cached by decoded image pixels.
+        cache_max_entries (int): Largest number of cached results.
+        cache_max_bytes (int): Largest estimated size of the cache in bytes.
+        cache_ttl_seconds (float): Seconds a cached result stays valid, 0 disables expiry.
+        params_image_size (list): List containing the dimensions of the input images.
+        params_mixed_precision (str): Keras dtype policy Keras models are served with.
+        params_jit_compile (bool): Whether inference of Keras models is compiled with XLA.
+    """
+    model_path: Path
+    reload_interval: float
+    micro_batching: bool
+    max_batch_size: int
+    max_wait_ms: float
+    batch_chunk_size: int
+    max_zip_members: int
+    max_zip_member_bytes: int
+    cache_enabled: bool
+    cache_max_entries: int
+    cache_max_bytes: int
+    cache_ttl_seconds: float
+    params_image_size: list
+    params_mixed_precision: str
+    params_jit_compile: bool
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """
+    Data class to hold configuration settings for the pre-fork production server.
+
+    Attributes:
+        bind (str): Address the server listens on.
+        workers (int): Number of worker processes.
+        threads (int): Request threads per worker process.
+        timeout (int): Seconds before a silent worker is restarted.
+        intra_op_threads (int): TensorFlow intra-op parallelism per worker.
+        inter_op_threads (int): TensorFlow inter-op parallelism per worker.
+    """
+    bind: str
+    workers: int
+    threads: int
+    timeout: int
+    intra_op_threads: int
+    inter_op_threads: int
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    """
+    Data class to hold configuration settings for hyperparameter sweeps.
+
+    Attributes:
+        root_dir (Path): Directory of results.csv and the trial directories.
+        threads_per_trial (int): TensorFlow intra-op and tf.data threads of each trial process.
+        max_parallel_trials (int): Trials run at once, 0 for cores // threads_per_trial.
+        max_trials (int): Random sample of the grid to run, 0 for all of it.
+        prune_after_epochs (int): First epoch at which a trial can be pruned.
+        min_trials_to_prune (int): Trials that must have reached an epoch before pruning at it.
+        search_space (dict): params.yaml key to the list of values to try.
+    """
+    root_dir: Path
+    threads_per_trial: int
+    max_parallel_trials: int
+    max_trials: int
+    prune_after_epochs: int
+    min_trials_to_prune: int
+    search_space: dict
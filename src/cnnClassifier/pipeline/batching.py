@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+import numpy as np
+from collections import Counter
+from concurrent.futures import Future
+
+from cnnClassifier import logger
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+from cnnClassifier.utils.monitoring import BATCH_QUEUE_SECONDS, BATCH_SIZE
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a PredictionPipeline.
+
+    Request threads decode their image and submit it; a single worker thread
+    collects submissions until `max_batch_size` images are queued or
+    `max_wait_ms` has passed since the first one arrived, runs one forward pass
+    for the whole batch and hands each caller its own result.
+    """
+    def __init__(self, pipeline: PredictionPipeline, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        """
+        Initialize the MicroBatcher and start its worker thread.
+
+        Parameters:
+            pipeline (PredictionPipeline): The pipeline running the forward pass.
+            max_batch_size (int): Largest number of images per forward pass.
+            max_wait_ms (float): Longest time the first image of a batch waits for others.
+        """
+        self.pipeline = pipeline
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        # Held while queueing, so nothing lands behind the shutdown marker
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._queue_delay_sum = 0.0
+        self._queue_delay_max = 0.0
+
+        self._worker = None
+        self.start()
+
+    def start(self):
+        """
+        Start the worker thread collecting batches.
+        """
+        with self._submit_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._closed = False
+            self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._worker.start()
+
+    def close(self):
+        """
+        Stop the worker thread once the queued requests are served.
+
+        Later submissions are refused until `start()` is called again.
+        """
+        with self._submit_lock:
+            self._closed = True
+            worker = self._worker
+            if worker is not None:
+                self._queue.put(None)
+        if worker is not None:
+            worker.join()
+            self._worker = None
+
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        Queue one decoded image for prediction.
+
+        Parameters:
+            image (np.ndarray): A single decoded image (H, W, 3).
+
+        Returns:
+            Future: Resolves to the prediction result for this image.
+
+        Raises:
+            RuntimeError: If the batcher has been closed.
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("the micro-batcher is closed")
+            self._queue.put((image, future, time.monotonic()))
+        return future
+
+    def predict_array(self, image: np.ndarray) -> list:
+        """
+        Predict the class of a single decoded image through the batcher.
+
+        Cached results are answered right away without joining a batch.
+
+        Returns:
+            list: A list containing the prediction result.
+        """
+        key, cached = self.pipeline.lookup(image)
+        if cached is not None:
+            return [cached]
+        result = self.submit(image).result()
+        self.pipeline.remember(key, result)
+        return [result]
+
+    def predict_bytes(self, data) -> list:
+        """
+        Decode an encoded image in the calling thread and predict it through the batcher.
+
+        Returns:
+            list: A list containing the prediction result.
+        """
+        return self.predict_array(self.pipeline.preprocess(data))
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Serve what we have, then let the run loop see the shutdown marker
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect(first)
+            started = time.monotonic()
+            self._record(len(batch), [started - enqueued for _, _, enqueued in batch])
+
+            try:
+                results = self.pipeline.predict_uncached(np.stack([image for image, _, _ in batch]))
+            except Exception as e:
+                logger.exception(f"Batched prediction of {len(batch)} images failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, batch_size: int, delays: list):
+        BATCH_SIZE.observe(batch_size)
+        for delay in delays:
+            BATCH_QUEUE_SECONDS.observe(delay)
+        with self._stats_lock:
+            self._batch_sizes[batch_size] += 1
+            self._requests += batch_size
+            self._queue_delay_sum += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+
+    def stats(self) -> dict:
+        """
+        Counters describing the batches formed so far.
+
+        Returns:
+            dict: Batch-size distribution, request count and queueing delay in seconds.
+        """
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "requests": self._requests,
+                "batches": batches,
+                "batch_size_distribution": dict(sorted(self._batch_sizes.items())),
+                "queue_delay_seconds_sum": self._queue_delay_sum,
+                "queue_delay_seconds_mean": self._queue_delay_sum / self._requests if self._requests else 0.0,
+                "queue_delay_seconds_max": self._queue_delay_max,
+            }
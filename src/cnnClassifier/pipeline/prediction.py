@@ -1,44 +1,441 @@
+import io
 import os
+import time
+import hashlib
+import threading
+import h5py
 import numpy as np
+import tensorflow as tf
+from PIL import Image
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
 from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
+
+from cnnClassifier import logger
+from cnnClassifier.components.serving_model import ServingModelExport
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.entity.config_entity import PredictionConfig
+from cnnClassifier.pipeline.prediction_cache import PredictionCache
+from cnnClassifier.utils.common import get_file_hash
+from cnnClassifier.utils.monitoring import MODEL_LOAD_SECONDS, MODEL_LOADS, PREDICT_STAGE_SECONDS
+from cnnClassifier.utils.precision import with_precision_policy
+
+
+def decode_image(data, image_size: list) -> np.ndarray:
+    """
+    Decode an encoded image into a uint8 array of `image_size` (H, W, C).
+
+    Uses the same RGB conversion and bilinear resize as the training data
+    generators. `data` may be bytes-like or a seekable binary file object; it
+    is read in place rather than copied into an intermediate buffer.
+    """
+    height, width = image_size[:2]
+    fileobj = data if hasattr(data, "read") else io.BytesIO(data)
+    with Image.open(fileobj) as img:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img = img.resize((width, height), Image.BILINEAR)
+        return np.asarray(img, dtype=np.uint8)
+
+
+class _KerasModel:
+    """
+    A Keras model file; rescaling to [0, 1] happens in NumPy before the forward pass.
+
+    The model is rebuilt on the configured dtype policy if it was saved with
+    another one, and its predict function is XLA-compiled with `jit_compile`
+    (once per batch shape).
+    """
+    accepts_encoded = False
+
+    def __init__(self, path: Path, data: Optional[bytes] = None, precision: str = "float32", jit_compile: bool = False):
+        if data is None:
+            model = load_model(path)
+        else:
+            # Build from the bytes already read for hashing instead of reading the file again
+            with h5py.File(io.BytesIO(data), "r") as h5file:
+                model = load_model(h5file)
+        self.model = with_precision_policy(model, precision)
+        self.model.jit_compile = jit_compile
+
+    def predict_uint8(self, images: np.ndarray) -> np.ndarray:
+        return self.model.predict_on_batch(images.astype(np.float32) * (1. / 255))
+
+    def warm_up(self, image_size: list):
+        self.predict_uint8(np.zeros([1] + list(image_size), dtype=np.uint8))
+
+
+class _ServingModel:
+    """
+    An exported serving model; decode, resize and rescale run inside the graph.
+    """
+    accepts_encoded = True
+
+    def __init__(self, path: Path):
+        self.model = ServingModelExport.load(path)
+
+    def predict_uint8(self, images: np.ndarray) -> np.ndarray:
+        return self.model.serve_uint8(tf.convert_to_tensor(images, dtype=tf.uint8))["probabilities"].numpy()
+
+    def predict_encoded(self, images: list) -> np.ndarray:
+        return self.model.serve_bytes(tf.constant(images, dtype=tf.string))["probabilities"].numpy()
+
+    def warm_up(self, image_size: list):
+        blank = np.zeros([1] + list(image_size), dtype=np.uint8)
+        self.predict_uint8(blank)
+        self.predict_encoded([tf.io.encode_png(blank[0]).numpy()])
+
+
+def _model_files(path: Path) -> list:
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file())
+    return [path]
+
+
+def _model_signature(path: Path) -> tuple:
+    """
+    Cheap change detector: newest mtime and total size of the model file(s).
+    """
+    stats = [os.stat(p) for p in _model_files(path)]
+    return max(st.st_mtime_ns for st in stats), sum(st.st_size for st in stats)
+
+
+def _model_hash(path: Path) -> str:
+    """
+    sha256 of the model file, or of every file of a SavedModel directory.
+    """
+    if not path.is_dir():
+        return get_file_hash(path)
+    digest = hashlib.sha256()
+    for file in _model_files(path):
+        digest.update(str(file.relative_to(path)).encode())
+        digest.update(get_file_hash(file).encode())
+    return digest.hexdigest()
+
+
+def read_model(path: Path) -> tuple:
+    """
+    Read the change signature, version and, for .h5 files, the bytes of a model.
+
+    Returns:
+        tuple: (signature, version, data) where data holds the bytes of an .h5
+        model file, or None for SavedModel directories which TensorFlow reads itself.
+    """
+    signature = _model_signature(path)
+    if path.is_dir() or path.suffix not in (".h5", ".hdf5"):
+        return signature, _model_hash(path), None
+    with open(path, "rb") as f:
+        data = f.read()
+    return signature, hashlib.sha256(data).hexdigest(), data
+
 
 class PredictionPipeline:
     """
     A class to handle prediction pipeline for image classification.
+
+    The model is loaded and warmed up once at construction. A background thread
+    watches the model file and swaps in a new model when its content changes;
+    the previous model keeps serving until the new one is loaded and warmed up.
+
+    Images are decoded from memory (`predict_bytes`, `predict_array`), so a single
+    instance can be shared by concurrent request threads. `model_path` may point
+    to a Keras .h5 file or to a serving model exported by ServingModelExport, in
+    which case decode/resize/rescale run inside the TensorFlow graph.
     """
-    def __init__(self, filename: str):
+    def __init__(self, filename: Optional[str] = None, config: Optional[PredictionConfig] = None,
+                 defer_load: bool = False):
         """
-        Initialize the PredictionPipeline with the image filename.
-        
+        Initialize the PredictionPipeline.
+
         Parameters:
-            filename (str): The path to the image file.
+            filename (str, optional): The path to the image file used by `predict`.
+            config (PredictionConfig, optional): Serving configuration. Read from
+                config.yaml when not given.
+            defer_load (bool): Leave the model file alone until `load()`. Used by
+                the pre-fork server: the TensorFlow runtime must not start in the
+                parent, so each worker reads and builds the model after the fork.
         """
         self.filename = filename
+        self.config = config if config is not None else ConfigurationManager().get_prediction_config()
 
-    def predict(self) -> list:
+        self.cache = None
+        if self.config.cache_enabled:
+            self.cache = PredictionCache(
+                max_entries=self.config.cache_max_entries,
+                max_bytes=self.config.cache_max_bytes,
+                ttl_seconds=self.config.cache_ttl_seconds
+            )
+
+        # (model, version) is swapped as a single reference so readers never
+        # see a model paired with the wrong version
+        self._state = None
+        self._stop_event = threading.Event()
+        self._watcher = None
+        if not defer_load:
+            self.load()
+
+    def load(self):
+        """
+        Build and warm up the model if that was deferred, then start the hot-reload watcher.
         """
-        Predict the class of the image.
-        
+        if self._state is None:
+            self._state = self._load(Path(self.config.model_path))
+        self.start_watcher()
+
+    @property
+    def model(self):
+        return self._state[0]
+
+    @property
+    def model_version(self) -> str:
+        return self._state[1]
+
+    def _load(self, path: Path) -> tuple:
+        """
+        Load and warm up the model stored at `path`.
+
+        Parameters:
+            path (Path): The model file or SavedModel directory.
+
+        Returns:
+            tuple: (model, version, signature) where version is the sha256 of the
+            model file(s) and signature their (mtime, size) at load time.
+        """
+        start = time.perf_counter()
+        signature, version, data = read_model(path)
+        if path.is_dir():
+            model = _ServingModel(path)
+        else:
+            model = _KerasModel(path, data, self.config.params_mixed_precision, self.config.params_jit_compile)
+
+        # One inference on a blank input builds the predict function before the first request
+        model.warm_up(self.config.params_image_size)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
+        MODEL_LOADS.inc()
+        logger.info(f"Loaded model {path} (version {version[:12]})")
+        return model, version, signature
+
+    def start_watcher(self):
+        """
+        Start the background thread that hot-reloads the model file.
+        """
+        if self.config.reload_interval <= 0:
+            return
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-reloader", daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        """
+        Stop the background model watcher.
+        """
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.config.reload_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.exception(f"Model reload failed, keeping version {self.model_version[:12]}: {e}")
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the model if the file's mtime/size changed and its content hash differs
+        from the served version.
+
+        Returns:
+            bool: True if a new model was swapped in.
+        """
+        path = Path(self.config.model_path)
+        current = _model_signature(path)
+        model, version, signature = self._state
+        if current == signature:
+            return False
+
+        if _model_hash(path) == version:
+            # Touched but unchanged, remember the new signature to skip rehashing
+            self._state = (model, version, current)
+            return False
+
+        self._state = self._load(path)
+        if self.cache is not None:
+            self.cache.clear()
+        logger.info(f"Hot-reloaded model {path}: {version[:12]} -> {self.model_version[:12]}")
+        return True
+
+    def preprocess(self, data) -> np.ndarray:
+        """
+        Decode an encoded image (JPEG, PNG, ...) from memory into a model input.
+
+        Parameters:
+            data (bytes or file object): The encoded image.
+
+        Returns:
+            np.ndarray: uint8 array of shape IMAGE_SIZE.
+        """
+        with PREDICT_STAGE_SECONDS.time(stage="decode"):
+            return decode_image(data, self.config.params_image_size)
+
+    @staticmethod
+    def _interpret(probabilities: np.ndarray) -> list:
+        """
+        Map model outputs to the response format, one entry per image.
+        """
+        result = np.argmax(probabilities, axis=1)
+        return [{"image": 'Normal' if index == 1 else 'Adenocarcinoma Cancer'} for index in result]
+
+    def predict_array(self, images: np.ndarray) -> list:
+        """
+        Predict the class of already decoded images.
+
+        Parameters:
+            images (np.ndarray): A single image (H, W, 3) or a batch (N, H, W, 3)
+                of size IMAGE_SIZE with pixel values in [0, 255].
+
+        Returns:
+            list: A list containing one prediction result per image.
+        """
+        if self.cache is None:
+            return self.predict_uncached(images)
+
+        images = np.asarray(images)
+        if images.ndim == 3:
+            images = np.expand_dims(images, axis=0)
+
+        model, version, _ = self._state
+
+        keys = [PredictionCache.make_key(image, version) for image in images]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            with PREDICT_STAGE_SECONDS.time(stage="inference"):
+                probabilities = model.predict_uint8(images[missing])
+            for i, prediction in zip(missing, self._interpret(probabilities)):
+                results[i] = prediction
+                self.cache.put(keys[i], prediction)
+        return results
+
+    def predict_uncached(self, images: np.ndarray) -> list:
+        """
+        Same as `predict_array` but always runs the model, bypassing the cache.
+        """
+        images = np.asarray(images)
+        if images.ndim == 3:
+            images = np.expand_dims(images, axis=0)
+        with PREDICT_STAGE_SECONDS.time(stage="inference"):
+            probabilities = self.model.predict_uint8(images)
+        return self._interpret(probabilities)
+
+    def lookup(self, image: np.ndarray) -> tuple:
+        """
+        Look a single decoded image up in the prediction cache.
+
+        Returns:
+            tuple: (key, result) where result is None on a miss; (None, None) when
+            caching is disabled.
+        """
+        if self.cache is None:
+            return None, None
+        key = PredictionCache.make_key(image, self.model_version)
+        return key, self.cache.get(key)
+
+    def remember(self, key: Optional[bytes], result: dict):
+        """
+        Store a result obtained for a key returned by `lookup`.
+        """
+        if self.cache is not None and key is not None:
+            self.cache.put(key, result)
+
+    def predict_bytes(self, data) -> list:
+        """
+        Predict the class of an encoded image held in memory.
+
+        Parameters:
+            data (bytes or file object): The encoded image.
+
         Returns:
             list: A list containing the prediction result.
         """
-        try:
-            # Load the model
-            # model = load_model(os.path.join("artifacts", "training", "model.h5"))
-            model = load_model(os.path.join("model", "model.h5"))
+        return self.predict_array(self.preprocess(data))
+
+    def predict_stream(self, items: Iterable, chunk_size: Optional[int] = None) -> Iterator[dict]:
+        """
+        Predict many encoded images in fixed-size chunks, yielding one result per image
+        as soon as its chunk has been through the model.
 
-            # Load and preprocess the image
-            test_image = image.load_img(self.filename, target_size=(224, 224))
-            test_image = image.img_to_array(test_image)
-            test_image = np.expand_dims(test_image, axis=0)
+        Parameters:
+            items (Iterable): (name, encoded image bytes) pairs, consumed lazily.
+            chunk_size (int, optional): Images per forward pass, defaults to batch_chunk_size.
+
+        Yields:
+            dict: {"index", "name", "image"} per image, or {"index", "name", "error"}
+            for images that could not be decoded or predicted.
+        """
+        chunk_size = chunk_size or self.config.batch_chunk_size
+        chunk = []
+        for index, (name, data) in enumerate(items):
+            chunk.append((index, name, data))
+            if len(chunk) == chunk_size:
+                yield from self._predict_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._predict_chunk(chunk)
+
+    def _predict_chunk(self, chunk: list) -> Iterator[dict]:
+        model = self.model
+        # The cache is keyed on decoded pixels like /predict, so with the cache on
+        # every image is decoded here rather than in the graph
+        if model.accepts_encoded and self.cache is None:
+            # Decode the whole chunk in the graph; fall back to per-image decoding
+            # below only if some image in it is broken
+            encoded = [data.read() if hasattr(data, "read") else bytes(data) for _, _, data in chunk]
+            try:
+                yield from self._predict_encoded_chunk(model, chunk, encoded)
+                return
+            except tf.errors.InvalidArgumentError:
+                chunk = [(index, name, data) for (index, name, _), data in zip(chunk, encoded)]
+
+        decoded, results = [], {}
+        for index, name, data in chunk:
+            try:
+                decoded.append((index, self.preprocess(data)))
+            except Exception as e:
+                results[index] = {"error": f"could not decode image: {e}"}
+
+        if decoded:
+            try:
+                predictions = self.predict_array(np.stack([array for _, array in decoded]))
+                results.update({index: prediction for (index, _), prediction in zip(decoded, predictions)})
+            except Exception as e:
+                results.update({index: {"error": str(e)} for index, _ in decoded})
+
+        for index, name, _ in chunk:
+            yield {"index": index, "name": name, **results[index]}
+
+    def _predict_encoded_chunk(self, model, chunk: list, encoded: list) -> Iterator[dict]:
+        # Decode, resize and forward pass all run inside the graph here
+        with PREDICT_STAGE_SECONDS.time(stage="graph_decode_inference"):
+            probabilities = model.predict_encoded(encoded)
+        results = self._interpret(probabilities)
 
-            # Perform prediction
-            result = np.argmax(model.predict(test_image), axis=1)
+        for (index, name, _), result in zip(chunk, results):
+            yield {"index": index, "name": name, **result}
 
-            # Interpret result
-            prediction = 'Normal' if result[0] == 1 else 'Adenocarcinoma Cancer'
-            return [{"image": prediction}]
+    def predict(self) -> list:
+        """
+        Predict the class of the image file given at construction.
+
+        Returns:
+            list: A list containing the prediction result.
+        """
+        try:
+            with open(self.filename, "rb") as f:
+                return self.predict_bytes(f.read())
 
         except Exception as e:
             print(f"An error occurred: {e}")
@@ -0,0 +1,115 @@
+import hashlib
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Optional
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of prediction results with a TTL.
+
+    Keys are a fast hash (blake2b) of the decoded image plus the model version,
+    so an image hits the cache however it was encoded or uploaded, and a new
+    model never serves results computed by the previous one. The cache
+    is bounded both by entry count and by an estimate of its size in bytes.
+    """
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600):
+        """
+        Initialize the PredictionCache.
+
+        Parameters:
+            max_entries (int): Largest number of cached results.
+            max_bytes (int): Largest estimated size of the cached keys and results.
+            ttl_seconds (float): Seconds a result stays valid, 0 keeps results until evicted.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(image: np.ndarray, model_version: str) -> bytes:
+        """
+        Hash the pixels of a decoded image together with the model version.
+        """
+        digest = hashlib.blake2b(model_version.encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(image))
+        return digest.digest()
+
+    @staticmethod
+    def _entry_size(key: bytes, value: dict) -> int:
+        return len(key) + sum(len(str(k)) + len(str(v)) for k, v in value.items())
+
+    def get(self, key: bytes) -> Optional[dict]:
+        """
+        Return the cached result for `key`, or None on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def put(self, key: bytes, value: dict):
+        """
+        Cache `value` under `key`, evicting least recently used entries past the bounds.
+        """
+        size = self._entry_size(key, value)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (dict(value), expires_at, size)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached result, e.g. after the model was reloaded.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Counters for sizing the cache.
+
+        Returns:
+            dict: Hits, misses, evictions, expirations, current entries and bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,36 @@
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.data_preprocessing import DataPreprocessing
+from cnnClassifier import logger
+
+STAGE_NAME = "Data Preprocessing stage"
+
+class DataPreprocessingPipeline:
+    """
+    Pipeline class to decode and resize the ingested images once for training and evaluation.
+    """
+
+    def __init__(self):
+        """
+        Initializes the DataPreprocessingPipeline instance.
+        """
+        pass
+
+    def main(self):
+        """
+        Main method to build the decoded and resized dataset cache.
+        """
+        config = ConfigurationManager()  # Initialize configuration manager
+        data_preprocessing_config = config.get_data_preprocessing_config()  # Retrieve preprocessing configuration
+        data_preprocessing = DataPreprocessing(config=data_preprocessing_config)
+        data_preprocessing.preprocess()  # Rebuilds the cache only if the images or IMAGE_SIZE changed
+
+if __name__ == '__main__':
+    try:
+        logger.info(f"*******************")
+        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        obj = DataPreprocessingPipeline()
+        obj.main()
+        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logger.exception(e)
+        raise e
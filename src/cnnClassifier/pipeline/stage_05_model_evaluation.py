@@ -1,11 +1,10 @@
+import argparse
+
 from cnnClassifier.config.configuration import ConfigurationManager
 from cnnClassifier.components.model_evaluation_mlflow import Evaluation
+from cnnClassifier.components.mlflow_tracking import MlflowTracker
 from cnnClassifier import logger
 
-import dagshub
-import mlflow
-import mlflow.keras
-
 # Define the stage name for logging purposes
 STAGE_NAME = "Evaluation stage"
 
@@ -20,37 +19,39 @@ class EvaluationPipeline:
         """
         pass
 
-    def main(self):
+    def main(self, force: bool = False):
         """
         Main method to execute the evaluation pipeline.
 
         This method initializes the configuration manager, retrieves the evaluation
-        configuration, performs the evaluation, saves the evaluation scores, and logs
-        the results into MLflow via DagsHub.
+        configuration, performs the evaluation, saves the evaluation scores, and hands
+        the results to a background process that logs them into MLflow via DagsHub.
+
+        Args:
+            force (bool): Re-run inference even when the model and data are unchanged.
         """
         config = ConfigurationManager()  # Initialize configuration manager
         eval_config = config.get_evaluation_config()  # Retrieve evaluation configuration
         evaluation = Evaluation(eval_config)  # Initialize evaluation with the config
-        evaluation.evaluation()  # Perform the evaluation
+        evaluation.evaluation(force=force)  # Perform the evaluation, or reuse stored scores
         evaluation.save_score()  # Save the evaluation scores
 
-        # Initialize DagsHub for MLflow tracking
-        #dagshub.init(repo_owner='jagadishmali567', 
-                     #repo_name='Production-Ready-Chest-Cancer-Detection-Deep-Learning-Model-MLOps-with-MLflow-DVC-CI-CD-and-AWS', 
-                     #mlflow=True)
-
-        # Log the evaluation results into MLflow via DagsHub
-        #with mlflow.start_run():
-            #mlflow.log_params(eval_config.all_params)
-            #mlflow.log_metrics({"loss": evaluation.score[0], "accuracy": evaluation.score[1]})
-            #mlflow.keras.log_model(evaluation.model, "model", registered_model_name="VGG16Model")
+        # Log the evaluation results into MLflow via DagsHub, in the background
+        tracking_config = config.get_mlflow_tracking_config()
+        if tracking_config.enabled:
+            evaluation.log_into_mlflow(MlflowTracker(tracking_config))
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evaluate the trained model on the validation subset.")
+    parser.add_argument("--force", action="store_true",
+                        help="recompute the scores even when the model, data and params are unchanged")
+    args = parser.parse_args()
+
     try:
         logger.info(f"*******************")
         logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
         obj = EvaluationPipeline()  # Create an instance of EvaluationPipeline
-        obj.main()  # Execute the main method
+        obj.main(force=args.force)  # Execute the main method
         logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
     except Exception as e:
         logger.exception(e)  # Log any exceptions that occur
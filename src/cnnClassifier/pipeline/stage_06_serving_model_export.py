@@ -0,0 +1,37 @@
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.serving_model import ServingModelExport
+from cnnClassifier import logger
+
+STAGE_NAME = "Serving model export stage"
+
+class ServingModelExportPipeline:
+    """
+    Pipeline class to export the trained model with in-graph preprocessing for serving.
+    """
+
+    def __init__(self):
+        """
+        Initializes the ServingModelExportPipeline instance.
+        """
+        pass
+
+    def main(self):
+        """
+        Main method to load the trained model and export the serving SavedModel.
+        """
+        config = ConfigurationManager()  # Initialize configuration manager
+        serving_model_config = config.get_serving_model_config()  # Retrieve export configuration
+        serving_model_export = ServingModelExport(config=serving_model_config)
+        serving_model_export.load_trained_model()  # Load the trained Keras model
+        serving_model_export.export()  # Export it with decode/resize/rescale in the graph
+
+if __name__ == '__main__':
+    try:
+        logger.info(f"*******************")
+        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
+        obj = ServingModelExportPipeline()
+        obj.main()
+        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+    except Exception as e:
+        logger.exception(e)
+        raise e
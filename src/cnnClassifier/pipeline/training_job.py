@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import shlex
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import TrainingJobConfig
+
+
+# dvc prints "Running stage 'training':", the stage scripts log ">>>>>> stage Training started <<<<<<"
+STAGE_PATTERNS = (
+    re.compile(r"Running stage '([^']+)'"),
+    re.compile(r">>>>>> stage (.+?) started <<<<<<"),
+)
+
+
+class TrainingJobRunner:
+    """
+    Runs the training DAG as a background job, one at a time.
+
+    `submit` returns immediately with the job id. The job runs the configured
+    command (`dvc repro` by default, which executes every stage once) in a
+    subprocess, tracks the current stage from its output and keeps the tail of
+    its logs. Job state is written to `root_dir/<job_id>.json` so any server
+    process can report it, and a lock file keeps a second run from starting
+    while one is active, also across worker processes.
+    """
+    def __init__(self, config: TrainingJobConfig):
+        """
+        Initialize the TrainingJobRunner.
+
+        Parameters:
+            config (TrainingJobConfig): Command, state directory and log settings.
+        """
+        self.config = config
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._active = None
+
+    def _state_path(self, job_id: str) -> Path:
+        return Path(self.config.root_dir) / f"{job_id}.json"
+
+    def _write_state(self, job: dict):
+        path = self._state_path(job["job_id"])
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({**job, "logs": list(job["logs"])}, f, indent=4)
+        os.replace(tmp, path)
+
+    def _acquire_run_lock(self):
+        lock_file = open(Path(self.config.root_dir) / "train.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def submit(self) -> tuple:
+        """
+        Start a training job unless one is already running.
+
+        Returns:
+            tuple: (job status dict, created) where created is False when the
+            returned job is the run already in progress.
+        """
+        with self._lock:
+            if self._active is not None:
+                return self.status(self._active["job_id"]), False
+
+            lock_file = self._acquire_run_lock()
+            # A run in another worker process writes its finished state just before releasing the lock
+            deadline = time.time() + 5.0
+            while lock_file is None:
+                running = self._running_elsewhere()
+                if running is not None:
+                    return running, False
+                if time.time() > deadline:
+                    raise RuntimeError("a training run holds the lock but its job state was not found")
+                time.sleep(0.05)
+                lock_file = self._acquire_run_lock()
+            self._mark_interrupted()
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "status": "running",
+                "stage": None,
+                "command": self.config.command,
+                "pid": None,
+                "returncode": None,
+                "started_at": time.time(),
+                "finished_at": None,
+                "logs": deque(maxlen=self.config.max_log_lines),
+            }
+            self._active = job
+            self._write_state(job)
+            threading.Thread(target=self._run, args=(job, lock_file), name=f"train-{job['job_id'][:8]}", daemon=True).start()
+            return self.status(job["job_id"]), True
+
+    def _mark_interrupted(self):
+        # Holding the lock means no run is alive, so "running" states are left over from a crash
+        for path in Path(self.config.root_dir).glob("*.json"):
+            job = self.status(path.stem)
+            if job is not None and job["status"] == "running":
+                job.pop("elapsed_seconds")
+                self._write_state({**job, "status": "interrupted"})
+
+    def _running_elsewhere(self) -> Optional[dict]:
+        for path in sorted(Path(self.config.root_dir).glob("*.json"), key=os.path.getmtime, reverse=True):
+            job = self.status(path.stem)
+            if job is not None and job["status"] == "running":
+                return job
+        return None
+
+    def _run(self, job: dict, lock_file):
+        last_write = 0.0
+        try:
+            process = subprocess.Popen(
+                shlex.split(self.config.command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+            job["pid"] = process.pid
+            logger.info(f"Training job {job['job_id']} started: {self.config.command} (pid {process.pid})")
+
+            for line in process.stdout:
+                line = line.rstrip("\n")
+                with self._log_lock:
+                    job["logs"].append(line)
+                for pattern in STAGE_PATTERNS:
+                    match = pattern.search(line)
+                    if match:
+                        job["stage"] = match.group(1)
+                        last_write = 0.0
+                if time.time() - last_write > 1.0:
+                    self._write_state(job)
+                    last_write = time.time()
+
+            job["returncode"] = process.wait()
+            job["status"] = "succeeded" if job["returncode"] == 0 else "failed"
+        except Exception as e:
+            logger.exception(f"Training job {job['job_id']} could not run: {e}")
+            job["logs"].append(str(e))
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            self._write_state(job)
+            # One step under _lock: a submit() in this process sees either the active job or a free run lock
+            with self._lock:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+                self._active = None
+            logger.info(f"Training job {job['job_id']} {job['status']}")
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Report a job's status, current stage, elapsed time and log tail.
+
+        Returns:
+            dict: The job status, or None for an unknown job id.
+        """
+        if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+            return None
+
+        active = self._active
+        if active is not None and active["job_id"] == job_id:
+            with self._log_lock:
+                job = {**active, "logs": list(active["logs"])}
+        else:
+            try:
+                with open(self._state_path(job_id)) as f:
+                    job = json.load(f)
+            except FileNotFoundError:
+                return None
+
+        end = job["finished_at"] or time.time()
+        job["elapsed_seconds"] = round(end - job["started_at"], 1)
+        return job
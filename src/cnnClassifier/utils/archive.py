@@ -0,0 +1,126 @@
+import os
+import zlib
+import shutil
+import zipfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from cnnClassifier import logger
+
+
+class ZipReader:
+    """
+    Reads members of one zip archive from many threads.
+
+    A ZipFile shares a single file position between its readers, so every
+    thread opens the archive once and keeps its own handle; decompression
+    releases the GIL, so members are inflated in parallel.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        with zipfile.ZipFile(self.path) as archive:
+            self.members = archive.infolist()
+
+    def _archive(self) -> zipfile.ZipFile:
+        archive = getattr(self._local, "archive", None)
+        if archive is None:
+            archive = self._local.archive = zipfile.ZipFile(self.path)
+        return archive
+
+    def open(self, member):
+        """
+        File object of a member, by name or ZipInfo, for the calling thread.
+        """
+        return self._archive().open(member)
+
+    def read(self, member) -> bytes:
+        """
+        Bytes of a member, by name or ZipInfo.
+        """
+        return self._archive().read(member)
+
+
+def file_crc32(path: Path) -> int:
+    """
+    CRC-32 of a file, as stored for zip members.
+    """
+    crc = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def extract_zip(path: Path, target_dir: Path, num_workers: int = 0, prune_dir: Path = None) -> tuple:
+    """
+    Extract a zip archive with a pool of threads, skipping members already on disk.
+
+    A member is skipped when a file of the same size and CRC-32 exists at its
+    target, so unchanged files are neither rewritten nor given a new
+    modification time. Members that would land outside `target_dir` are
+    refused, as extractall does. Files under `prune_dir` that are not members
+    of the archive, left by an earlier extraction of a larger archive, are
+    deleted, so the directory mirrors the archive.
+
+    Args:
+        path (Path): The zip archive.
+        target_dir (Path): Directory to extract into.
+        num_workers (int): Extracting threads, 0 for one per core.
+        prune_dir (Path, optional): Directory under `target_dir` to remove stale files from.
+
+    Returns:
+        tuple: (members extracted, members skipped, stale files removed)
+    """
+    reader = ZipReader(path)
+    target_dir = Path(target_dir)
+    root = os.path.realpath(target_dir)
+
+    files, directories = [], set()
+    for member in reader.members:
+        target = os.path.realpath(os.path.join(root, member.filename))
+        if os.path.commonpath([root, target]) != root:
+            raise ValueError(f"Zip member {member.filename!r} of {path} points outside {target_dir}")
+        if member.is_dir():
+            os.makedirs(target, exist_ok=True)
+            directories.add(target)
+        else:
+            files.append((member, target))
+
+    def extract(item) -> bool:
+        member, target = item
+        if os.path.isfile(target) and os.path.getsize(target) == member.file_size and file_crc32(target) == member.CRC:
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with reader.open(member) as source, open(target, "wb") as f:
+            shutil.copyfileobj(source, f, 1 << 20)
+        return True
+
+    workers = num_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        extracted = sum(executor.map(extract, files))
+
+    removed = _prune(prune_dir, {target for _, target in files}, directories) if prune_dir is not None else 0
+
+    logger.info(f"Extracted {path} into {target_dir} with {workers} threads: "
+                f"{extracted} members written, {len(files) - extracted} unchanged, {removed} stale files removed")
+    return extracted, len(files) - extracted, removed
+
+
+def _prune(directory: Path, files: set, directories: set) -> int:
+    """
+    Delete the files under `directory` whose real path is not in `files`, then
+    the directories left empty that are not in `directories`.
+    """
+    top = os.path.realpath(directory)
+    removed = 0
+    for root, _, names in os.walk(top, topdown=False):
+        for name in names:
+            path = os.path.join(root, name)
+            if path not in files:
+                os.remove(path)
+                removed += 1
+        if root != top and root not in directories and not os.listdir(root):
+            os.rmdir(root)
+    return removed
@@ -9,6 +9,7 @@ from box import ConfigBox
 from pathlib import Path
 from typing import Any
 import base64
+import hashlib
 
 
 @ensure_annotations
@@ -120,6 +121,35 @@ def get_size(path: Path) -> str:
     return f"~ {size_in_kb} KB"
 
 
+@ensure_annotations
+def get_file_hash(path: Path) -> str:
+    """get sha256 hex digest of a file
+
+    Args:
+        path (Path): path of the file
+
+    Returns:
+        str: sha256 hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts) -> str:
+    """hash JSON-serializable parts into a cache key
+
+    Used wherever a cached result must be rebuilt when any of its inputs
+    (file hashes, settings, ...) changes.
+
+    Returns:
+        str: sha256 hex digest of the parts
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
 def decodeImage(imgstring, fileName):
     imgdata = base64.b64decode(imgstring)
     with open(fileName, 'wb') as f:
@@ -0,0 +1,85 @@
+import os
+import tensorflow as tf
+
+from cnnClassifier import logger
+
+
+COMMUNICATION_IMPLEMENTATIONS = {
+    "auto": tf.distribute.experimental.CommunicationImplementation.AUTO,
+    "ring": tf.distribute.experimental.CommunicationImplementation.RING,
+}
+
+
+def get_strategy(workers: list, task_index: int = 0, communication: str = "auto") -> tf.distribute.Strategy:
+    """
+    The distribution strategy for training.
+
+    With more than one worker, in `workers` or in a TF_CONFIG environment
+    variable (which takes precedence), returns a MultiWorkerMirroredStrategy:
+    every worker holds a copy of the model and gradients are all-reduced after
+    each step. Otherwise returns the default, single-process strategy. The
+    cluster reaches the strategy through a cluster resolver and the process
+    environment is left as it is, so later trainings in the same process
+    (sweep trials, training jobs) do not join the cluster.
+
+    Must be called before any other TensorFlow op runs in the process.
+
+    Args:
+        workers (list): "host:port" of every worker, the chief first.
+        task_index (int): Position of this process in `workers`.
+        communication (str): Collective implementation, "auto" or "ring".
+
+    Returns:
+        tf.distribute.Strategy: The strategy to build and train the model under.
+    """
+    if communication not in COMMUNICATION_IMPLEMENTATIONS:
+        raise ValueError(f"Unknown communication {communication!r}, expected one of {tuple(COMMUNICATION_IMPLEMENTATIONS)}")
+
+    if "TF_CONFIG" in os.environ:
+        resolver = tf.distribute.cluster_resolver.TFConfigClusterResolver()
+    elif workers:
+        resolver = tf.distribute.cluster_resolver.SimpleClusterResolver(
+            tf.train.ClusterSpec({"worker": list(workers)}),
+            task_type="worker",
+            task_id=task_index,
+            rpc_layer="grpc"
+        )
+    else:
+        return tf.distribute.get_strategy()
+
+    cluster = resolver.cluster_spec().as_dict()
+    if len(cluster.get("chief", [])) + len(cluster.get("worker", [])) <= 1:
+        return tf.distribute.get_strategy()
+
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(
+        cluster_resolver=resolver,
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=COMMUNICATION_IMPLEMENTATIONS[communication]
+        )
+    )
+    logger.info(f"Multi-worker training as {resolver.task_type} {resolver.task_id} of {num_workers(strategy)} workers")
+    return strategy
+
+
+def num_workers(strategy: tf.distribute.Strategy) -> int:
+    """
+    Number of training processes in the cluster, 1 without one.
+    """
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None:
+        return 1
+    cluster = resolver.cluster_spec().as_dict()
+    return max(1, len(cluster.get("chief", [])) + len(cluster.get("worker", [])))
+
+
+def is_chief(strategy: tf.distribute.Strategy) -> bool:
+    """
+    Whether this process writes the results: the "chief" task, or worker 0 in
+    a cluster without one. Always True without a cluster.
+    """
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or resolver.task_type is None:
+        return True
+    if resolver.task_type == "chief":
+        return True
+    return resolver.task_type == "worker" and resolver.task_id == 0 and "chief" not in resolver.cluster_spec().as_dict()
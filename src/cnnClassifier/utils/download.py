@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import shutil
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import get_file_hash
+
+
+GOOGLE_DRIVE_FILE = re.compile(r"https://drive\.google\.com/(?:file/d/|open\?id=|uc\?.*id=)([\w-]+)")
+
+
+def resolve_url(url: str) -> str:
+    """
+    Direct download URL of a Google Drive sharing link; other URLs are returned unchanged.
+
+    The usercontent endpoint serves the file itself, even past the virus scan
+    page of large files, and answers range requests.
+    """
+    match = GOOGLE_DRIVE_FILE.match(url)
+    if match is None:
+        return url
+    return f"https://drive.usercontent.google.com/download?id={match.group(1)}&export=download&confirm=t"
+
+
+def probe(url: str, timeout: float) -> dict:
+    """
+    Size, validator and range support of a remote file, from a HEAD request.
+
+    Returns:
+        dict: size (None when unknown), ranges (bool) and validator (ETag or
+        Last-Modified, None when the server sends neither).
+    """
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            headers = response.headers
+    except urllib.error.HTTPError as e:
+        # Some servers refuse HEAD; the download then runs as one plain GET
+        logger.info(f"HEAD {url} failed with HTTP {e.code}, downloading without ranges")
+        return {"size": None, "ranges": False, "validator": None}
+    size = headers.get("Content-Length")
+    return {
+        "size": int(size) if size is not None else None,
+        "ranges": headers.get("Accept-Ranges", "").lower() == "bytes",
+        "validator": headers.get("ETag") or headers.get("Last-Modified"),
+    }
+
+
+def _check_content(response, url: str):
+    if response.headers.get_content_type() == "text/html":
+        raise ValueError(f"{url} returned an HTML page instead of the file; check that the link is shared publicly")
+
+
+def _fetch_chunk(url: str, path: Path, start: int, end: int, timeout: float):
+    """
+    Write bytes start..end (inclusive) of the remote file at the same offset of `path`.
+    """
+    request = urllib.request.Request(url, headers={"Range": f"bytes={start}-{end}"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        if response.status != 206:
+            raise IOError(f"{url} ignored the range request for bytes {start}-{end} (HTTP {response.status})")
+        _check_content(response, url)
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            offset = start
+            for block in iter(lambda: response.read(1 << 20), b""):
+                offset += os.pwrite(fd, block, offset)
+        finally:
+            os.close(fd)
+    if offset != end + 1:
+        raise IOError(f"{url} ended after {offset - start} of {end - start + 1} bytes of a chunk")
+
+
+def _download_chunked(url: str, part_path: Path, remote: dict, workers: int, chunk_size: int, timeout: float):
+    """
+    Download in byte ranges, `workers` at a time, into a pre-sized `part_path`.
+
+    Finished chunks are recorded next to the partial file as they complete, so
+    an interrupted download resumes with the missing chunks only. After a
+    failed chunk, queued chunks are cancelled and those already in flight are
+    still recorded. The record is dropped when the remote file's size or
+    validator changed.
+    """
+    state_path = part_path.with_name(part_path.name + ".json")
+    size = remote["size"]
+    state = {"url": url, "size": size, "validator": remote["validator"], "chunk_size": chunk_size, "done": []}
+    try:
+        with open(state_path) as f:
+            previous = json.load(f)
+        if {key: previous[key] for key in ("url", "size", "validator", "chunk_size")} == \
+                {key: state[key] for key in ("url", "size", "validator", "chunk_size")} and part_path.exists():
+            state["done"] = previous["done"]
+    except (FileNotFoundError, KeyError, ValueError):
+        pass
+
+    if not state["done"]:
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+    done = set(state["done"])
+    chunks = [index for index in range(-(-size // chunk_size)) if index not in done]
+    if state["done"]:
+        logger.info(f"Resuming download: {len(state['done'])} chunks present, {len(chunks)} to go")
+
+    def fetch(index: int) -> int:
+        start = index * chunk_size
+        _fetch_chunk(url, part_path, start, min(start + chunk_size, size) - 1, timeout)
+        return index
+
+    failure = None
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+        futures = [executor.submit(fetch, index) for index in chunks]
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                if failure is None:
+                    failure = future.exception()
+                    for pending in futures:
+                        pending.cancel()
+                continue
+            state["done"].append(future.result())
+            with open(state_path, "w") as f:
+                json.dump(state, f)
+    if failure is not None:
+        raise failure
+    state_path.unlink()
+
+
+def _download_stream(url: str, part_path: Path, timeout: float):
+    """
+    Download in one GET, for servers without range support or a known size.
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as response, open(part_path, "wb") as f:
+        _check_content(response, url)
+        shutil.copyfileobj(response, f, 1 << 20)
+
+
+def download(url: str, path: Path, expected_sha256: Optional[str] = None, workers: int = 4,
+             chunk_size: int = 8 << 20, timeout: float = 60) -> bool:
+    """
+    Download `url` to `path` unless an identical file is already there.
+
+    An existing file is kept when it matches `expected_sha256` or, without an
+    expected digest, when its size equals the remote size. Servers that accept
+    byte ranges are downloaded in `chunk_size` ranges over `workers`
+    connections, and an interrupted download resumes with the missing ranges.
+    The file only appears at `path` once complete and, with `expected_sha256`,
+    verified.
+
+    Args:
+        url (str): http(s) URL of the file, or a Google Drive sharing link.
+        path (Path): Where to store the file.
+        expected_sha256 (str, optional): SHA-256 hex digest the file must have.
+        workers (int): Parallel range requests.
+        chunk_size (int): Bytes per range request.
+        timeout (float): Seconds to wait on a connection before giving up.
+
+    Returns:
+        bool: True when the file was downloaded, False when the local one was kept.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+
+    if expected_sha256 and path.exists() and get_file_hash(path) == expected_sha256:
+        logger.info(f"{path} matches the expected SHA-256, skipping the download")
+        return False
+
+    url = resolve_url(url)
+    remote = probe(url, timeout)
+    if not expected_sha256 and path.exists() and remote["size"] is not None and path.stat().st_size == remote["size"]:
+        logger.info(f"{path} has the size of the remote file ({remote['size']} bytes), skipping the download")
+        return False
+
+    part_path = path.with_name(path.name + ".part")
+    if remote["ranges"] and remote["size"]:
+        logger.info(f"Downloading {url} ({remote['size']} bytes) with up to {workers} parallel range requests")
+        _download_chunked(url, part_path, remote, workers, chunk_size, timeout)
+    else:
+        logger.info(f"Downloading {url}")
+        _download_stream(url, part_path, timeout)
+
+    sha256 = get_file_hash(part_path)
+    if expected_sha256 and sha256 != expected_sha256:
+        part_path.unlink()
+        raise ValueError(f"SHA-256 of the download from {url} is {sha256}, expected {expected_sha256}")
+    os.replace(part_path, path)
+    logger.info(f"Downloaded {path} ({path.stat().st_size} bytes, SHA-256 {sha256})")
+    return True
@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Latency buckets in seconds, from sub-millisecond decode steps up to slow forward passes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Base class for metrics kept in memory and rendered in the Prometheus text format.
+
+    Recording only touches a dict under a lock, so metrics cost next to nothing
+    until someone scrapes them.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> list:
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count.
+    """
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down.
+    """
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, with their sum and count.
+    """
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts[0][index] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the wall-clock duration of the `with` block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list:
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(buckets), total, count)) for key, (buckets, total, count) in self._values.items())
+        for key, (buckets, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, buckets):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (("le", _format_value(float(bound))),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+class Registry:
+    """
+    Holds every metric plus collector callbacks that report values owned by
+    other objects (e.g. cache counters) at scrape time.
+    """
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector):
+        """
+        Register a callable returning (name, type, documentation, value) tuples.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, type_name, documentation, value in collector():
+                lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {type_name}",
+                              f"{name} {_format_value(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Serving metrics
+HTTP_REQUESTS = Counter("cnn_http_requests_total", "HTTP requests served.", ("endpoint", "status"))
+HTTP_ERRORS = Counter("cnn_http_request_errors_total", "Requests that failed while predicting or training.", ("endpoint",))
+HTTP_REQUEST_SECONDS = Histogram("cnn_http_request_seconds", "Time to produce an HTTP response.", ("endpoint",))
+HTTP_IN_FLIGHT = Gauge("cnn_http_requests_in_flight", "HTTP requests currently being handled.")
+PREDICT_STAGE_SECONDS = Histogram("cnn_predict_stage_seconds", "Time spent per prediction stage (parse, decode, inference, serialize).", ("stage",))
+MODEL_LOAD_SECONDS = Gauge("cnn_model_load_seconds", "Time the last model load and warm-up took.")
+MODEL_LOADS = Counter("cnn_model_loads_total", "Models loaded, including hot reloads.")
+BATCH_SIZE = Histogram("cnn_micro_batch_size", "Images per micro-batched forward pass.", buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_QUEUE_SECONDS = Histogram("cnn_micro_batch_queue_seconds", "Time a request waited for its micro-batch to start.")
@@ -0,0 +1,55 @@
+import tensorflow as tf
+
+from cnnClassifier import logger
+
+
+# float32 is the default; the mixed policies keep float32 variables and compute in 16 bits
+PRECISION_POLICIES = ("float32", "mixed_bfloat16", "mixed_float16")
+
+
+def _check_policy(policy: str):
+    if policy not in PRECISION_POLICIES:
+        raise ValueError(f"Unknown MIXED_PRECISION {policy!r}, expected one of {PRECISION_POLICIES}")
+
+
+def set_precision_policy(policy: str):
+    """
+    Set the Keras global dtype policy used by layers built from now on.
+
+    Args:
+        policy (str): "float32", "mixed_bfloat16" or "mixed_float16".
+    """
+    _check_policy(policy)
+    tf.keras.mixed_precision.set_global_policy(policy)
+    logger.info(f"Keras dtype policy set to {policy}")
+
+
+def with_precision_policy(model: tf.keras.Model, policy: str) -> tf.keras.Model:
+    """
+    Rebuild a functional model with every layer on `policy`, except the output
+    layer, which stays float32 so probabilities are computed at full precision.
+
+    Mixed policies keep float32 variables, so the weights are copied unchanged.
+
+    Args:
+        model (tf.keras.Model): A functional Keras model.
+        policy (str): "float32", "mixed_bfloat16" or "mixed_float16".
+
+    Returns:
+        tf.keras.Model: The same model, or a rebuilt copy on the new policy.
+    """
+    _check_policy(policy)
+    config = model.get_config()
+    output_layers = {name for name, _, _ in config["output_layers"]}
+    hidden_layers = [layer for layer in model.layers
+                     if not isinstance(layer, tf.keras.layers.InputLayer) and layer.name not in output_layers]
+    if all(layer.dtype_policy.name == policy for layer in hidden_layers):
+        return model
+
+    for layer in config["layers"]:
+        if layer["class_name"] != "InputLayer" and layer["name"] not in output_layers:
+            layer["config"]["dtype"] = policy
+    rebuilt = tf.keras.Model.from_config(config)
+    rebuilt.set_weights(model.get_weights())
+    logger.info(f"Rebuilt model {model.name} with dtype policy {policy}")
+    return rebuilt
@@ -0,0 +1,56 @@
+"""
+Hyperparameter sweep over params.yaml values.
+
+Trains one model per combination of the values in the `sweep.search_space`
+section of config/config.yaml, several trials at once in separate processes
+with a fixed number of TensorFlow threads each. All trials read the
+preprocessed dataset (built first if needed), trials whose val_loss falls
+behind the median of the others are pruned, and every trial's params and
+validation loss and accuracy are written to artifacts/sweep/results.csv.
+params.yaml and the pipeline's artifacts are left untouched.
+
+Usage:
+    python sweep.py [--max-parallel N] [--threads N] [--max-trials N]
+"""
+import argparse
+import dataclasses
+
+from cnnClassifier import logger
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.components.hyperparameter_sweep import HyperparameterSweep
+
+
+def main():
+    manager = ConfigurationManager()
+    sweep_config = manager.get_sweep_config()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-parallel", type=int, default=sweep_config.max_parallel_trials,
+                        help="trials run at once, 0 fills the cores")
+    parser.add_argument("--threads", type=int, default=sweep_config.threads_per_trial,
+                        help="TensorFlow threads per trial")
+    parser.add_argument("--max-trials", type=int, default=sweep_config.max_trials,
+                        help="random sample of the grid, 0 runs all of it")
+    args = parser.parse_args()
+
+    sweep_config = dataclasses.replace(
+        sweep_config,
+        max_parallel_trials=args.max_parallel,
+        threads_per_trial=args.threads,
+        max_trials=args.max_trials
+    )
+    sweep = HyperparameterSweep(
+        config=sweep_config,
+        training_config=manager.get_training_config(),
+        preprocessing_config=manager.get_data_preprocessing_config()
+    )
+    results = sweep.run()
+
+    finished = [result for result in results if result["status"] != "failed"]
+    if finished:
+        best = max(finished, key=lambda result: result["accuracy"])
+        logger.info(f"Best trial {best['trial']}: accuracy {best['accuracy']:.4f}, loss {best['loss']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
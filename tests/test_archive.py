@@ -0,0 +1,60 @@
+import os
+import zipfile
+
+import pytest
+
+from cnnClassifier.utils.archive import extract_zip
+from cnnClassifier.components.data_manifest import DataManifest
+
+
+def make_zip(path, members: dict):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+MEMBERS = {
+    "data/adenocarcinoma/1.png": b"first image",
+    "data/adenocarcinoma/2.png": b"second image",
+    "data/normal/3.png": b"third image",
+    "data/large/4.png": b"fourth image",
+}
+
+
+def test_unchanged_members_are_not_rewritten(tmp_path):
+    make_zip(tmp_path / "data.zip", MEMBERS)
+    assert extract_zip(tmp_path / "data.zip", tmp_path / "out", num_workers=2) == (4, 0, 0)
+    target = tmp_path / "out" / "data" / "normal" / "3.png"
+    os.utime(target, ns=(1, 1))
+
+    # Same size, different content: rewritten even though the size matches
+    (tmp_path / "out" / "data" / "adenocarcinoma" / "1.png").write_bytes(b"FIRST IMAGE")
+    assert extract_zip(tmp_path / "data.zip", tmp_path / "out", num_workers=2) == (1, 3, 0)
+    assert (tmp_path / "out" / "data" / "adenocarcinoma" / "1.png").read_bytes() == b"first image"
+    assert os.stat(target).st_mtime_ns == 1
+
+
+def test_shrinking_archive_prunes_stale_files(tmp_path):
+    make_zip(tmp_path / "data.zip", MEMBERS)
+    extract_zip(tmp_path / "data.zip", tmp_path, prune_dir=tmp_path / "data")
+
+    smaller = {name: data for name, data in MEMBERS.items() if not name.endswith(("2.png", "4.png"))}
+    make_zip(tmp_path / "data.zip", smaller)
+    assert extract_zip(tmp_path / "data.zip", tmp_path, prune_dir=tmp_path / "data") == (0, 2, 2)
+
+    remaining = sorted(str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*.png"))
+    assert remaining == ["data/adenocarcinoma/1.png", "data/normal/3.png"]
+    assert not (tmp_path / "data" / "large").exists()
+    # Files outside the pruned directory, such as the archive itself, are left alone
+    assert (tmp_path / "data.zip").exists()
+
+    manifest = DataManifest.scan(tmp_path / "data", validation_split=0.5)
+    assert [entry["path"] for entry in manifest.files] == ["adenocarcinoma/1.png", "normal/3.png"]
+    assert manifest.class_names == ["adenocarcinoma", "normal"]
+
+
+def test_member_outside_target_is_refused(tmp_path):
+    make_zip(tmp_path / "data.zip", {"../escape.png": b"image"})
+    with pytest.raises(ValueError, match="outside"):
+        extract_zip(tmp_path / "data.zip", tmp_path / "out")
+    assert not (tmp_path / "escape.png").exists()
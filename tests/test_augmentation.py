@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+from cnnClassifier.components.augmentation import RandomAffineTransform
+
+
+RANGES = dict(rotation_range=40, width_shift_range=0.2, height_shift_range=0.1, shear_range=20, zoom_range=0.2)
+
+
+class FixedAffineTransform(RandomAffineTransform):
+    """
+    Draws the given fractions of each range instead of random values, in the
+    order the layer draws them: rotation, x shift, y shift, shear, x zoom, y zoom.
+    """
+    def __init__(self, fractions: list, flip: bool = False, **kwargs):
+        super().__init__(horizontal_flip=flip, **kwargs)
+        self.fractions = list(fractions)
+
+    def _uniform(self, batch_size, limit: float, center: float = 0.0):
+        return tf.fill([batch_size], center + self.fractions.pop(0) * limit)
+
+    def transforms(self, batch_size, height, width):
+        if not self.horizontal_flip:
+            return super().transforms(batch_size, height, width)
+        # Flip every image: the flip draw is below 0.5
+        uniform = tf.random.uniform
+        tf.random.uniform = lambda shape, **kwargs: tf.zeros(shape)
+        try:
+            return super().transforms(batch_size, height, width)
+        finally:
+            tf.random.uniform = uniform
+
+
+def keras_transform(image: np.ndarray, fractions: list, flip: bool = False) -> np.ndarray:
+    """
+    ImageDataGenerator's transform of `image` with the same draws.
+    """
+    height, width = image.shape[:2]
+    rotation, shift_x, shift_y, shear, zoom_x, zoom_y = fractions
+    generator = ImageDataGenerator(fill_mode="nearest")
+    return generator.apply_transform(image, {
+        "theta": rotation * RANGES["rotation_range"],
+        "tx": shift_x * RANGES["height_shift_range"] * height,
+        "ty": shift_y * RANGES["width_shift_range"] * width,
+        "shear": shear * RANGES["shear_range"],
+        "zx": 1 + zoom_x * RANGES["zoom_range"],
+        "zy": 1 + zoom_y * RANGES["zoom_range"],
+        "flip_horizontal": flip,
+    })
+
+
+@pytest.mark.parametrize("shape", [(32, 32), (24, 40), (40, 24)])
+@pytest.mark.parametrize("flip", [False, True])
+def test_matches_image_data_generator(shape, flip):
+    rng = np.random.default_rng(0)
+    # A smooth image, so bilinear sampling differences stay at float rounding
+    rows, cols = np.meshgrid(np.linspace(0, 1, shape[0]), np.linspace(0, 1, shape[1]), indexing="ij")
+    image = np.stack([rows, cols, rows * cols], axis=-1).astype(np.float32) + rng.uniform(0, 0.01, shape + (3,)).astype(np.float32)
+    fractions = [0.7, -0.4, 0.9, 0.5, -0.6, 0.3]
+
+    layer = FixedAffineTransform(fractions, flip=flip, **RANGES)
+    ours = layer(image[None], training=True)[0].numpy()
+    expected = keras_transform(image, fractions, flip)
+
+    # Fill at the border differs by a pixel between SciPy and TensorFlow, compare the inside
+    np.testing.assert_allclose(ours[2:-2, 2:-2], expected[2:-2, 2:-2], atol=1e-4)
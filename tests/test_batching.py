@@ -0,0 +1,46 @@
+import threading
+
+import numpy as np
+import pytest
+
+from cnnClassifier.pipeline.batching import MicroBatcher
+
+
+class SlowPipeline:
+    """
+    Stands in for PredictionPipeline: answers each image with its first pixel,
+    after `release` is set.
+    """
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict_uncached(self, images: np.ndarray) -> list:
+        self.release.wait(5)
+        return [{"image": int(image.flat[0])} for image in images]
+
+
+def test_close_serves_queued_requests_and_refuses_new_ones():
+    pipeline = SlowPipeline()
+    batcher = MicroBatcher(pipeline, max_batch_size=2, max_wait_ms=0)
+    futures = [batcher.submit(np.full((2, 2, 3), value)) for value in range(5)]
+
+    closing = threading.Thread(target=batcher.close)
+    closing.start()
+    pipeline.release.set()
+    closing.join(5)
+    assert not closing.is_alive()
+
+    assert [future.result(timeout=0) for future in futures] == [{"image": value} for value in range(5)]
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit(np.zeros((2, 2, 3)))
+
+
+def test_start_reopens_a_closed_batcher():
+    pipeline = SlowPipeline()
+    pipeline.release.set()
+    batcher = MicroBatcher(pipeline, max_wait_ms=0)
+    batcher.close()
+
+    batcher.start()
+    assert batcher.submit(np.full((2, 2, 3), 7)).result(timeout=5) == {"image": 7}
+    batcher.close()
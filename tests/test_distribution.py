@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import socket
+import subprocess
+
+
+WORKER = """
+import os, sys, json
+import tensorflow as tf
+from cnnClassifier.utils.distribution import get_strategy, num_workers, is_chief
+
+workers, task_index = sys.argv[1].split(","), int(sys.argv[2])
+strategy = get_strategy(workers, task_index)
+total = strategy.reduce(
+    tf.distribute.ReduceOp.SUM,
+    strategy.run(lambda: tf.constant(float(task_index + 1))),
+    axis=None
+)
+print(json.dumps({
+    "workers": num_workers(strategy),
+    "chief": is_chief(strategy),
+    "total": float(total),
+    "tf_config": "TF_CONFIG" in os.environ,
+}))
+"""
+
+
+def free_ports(count: int) -> list:
+    sockets = [socket.socket() for _ in range(count)]
+    for sock in sockets:
+        sock.bind(("127.0.0.1", 0))
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+
+def test_two_local_workers_all_reduce_without_tf_config():
+    workers = ",".join(f"127.0.0.1:{port}" for port in free_ports(2))
+    env = {key: value for key, value in os.environ.items() if key != "TF_CONFIG"}
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER, workers, str(index)], env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for index in range(2)
+    ]
+    results = []
+    try:
+        for process in processes:
+            stdout, stderr = process.communicate(timeout=180)
+            assert process.returncode == 0, stderr[-2000:]
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+    finally:
+        for process in processes:
+            process.kill()
+
+    assert [result["workers"] for result in results] == [2, 2]
+    assert [result["chief"] for result in results] == [True, False]
+    assert [result["total"] for result in results] == [3.0, 3.0]
+    assert not any(result["tf_config"] for result in results)
+
+
+def test_single_worker_uses_the_default_strategy(monkeypatch):
+    import tensorflow as tf
+    from cnnClassifier.utils.distribution import get_strategy, num_workers, is_chief
+
+    monkeypatch.delenv("TF_CONFIG", raising=False)
+    strategy = get_strategy(["127.0.0.1:2222"])
+    assert strategy is tf.distribute.get_strategy()
+    assert num_workers(strategy) == 1 and is_chief(strategy)
+    assert "TF_CONFIG" not in os.environ
@@ -0,0 +1,174 @@
+import json
+import hashlib
+import threading
+import time
+import urllib.error
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import yaml
+
+from cnnClassifier.utils.download import download
+from cnnClassifier.components.data_ingestion import DataIngestion
+from cnnClassifier.config.configuration import ConfigurationManager
+
+
+CHUNK = 1024
+PAYLOAD = bytes(range(256)) * 40  # 10 chunks
+REPO = Path(__file__).resolve().parents[1]
+
+
+class FileServer(ThreadingHTTPServer):
+    """
+    Serves one payload, with byte ranges when `ranges` is set.
+
+    A range request starting at an offset in `fail_offsets` answers HTTP 500
+    after `fail_delay` seconds, once per listed offset.
+    """
+    daemon_threads = True
+
+    def __init__(self, payload: bytes, ranges: bool = True):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.payload = payload
+        self.ranges = ranges
+        self.fail_offsets = set()
+        self.fail_delay = 0.0
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/data.zip"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_common_headers(self, length: int):
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(length))
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", hashlib.sha256(self.server.payload).hexdigest()[:16])
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_common_headers(len(self.server.payload))
+
+    def do_GET(self):
+        payload = self.server.payload
+        byte_range = self.headers.get("Range")
+        with self.server.lock:
+            self.server.requests.append(byte_range)
+        if byte_range is None or not self.server.ranges:
+            self.send_response(200)
+            self.send_common_headers(len(payload))
+            self.wfile.write(payload)
+            return
+
+        start, end = (int(value) for value in byte_range[len("bytes="):].split("-"))
+        with self.server.lock:
+            fail = start in self.server.fail_offsets
+            self.server.fail_offsets.discard(start)
+        if fail:
+            time.sleep(self.server.fail_delay)
+            self.send_error(500)
+            return
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        self.send_common_headers(end - start + 1)
+        self.wfile.write(payload[start:end + 1])
+
+
+@pytest.fixture
+def server(request):
+    server = FileServer(PAYLOAD, ranges=getattr(request, "param", True))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_interrupted_download_resumes_with_missing_chunks(server, tmp_path):
+    path = tmp_path / "data.zip"
+    # The first chunk fails last, after the chunks in flight beside it completed
+    server.fail_offsets = {0}
+    server.fail_delay = 0.3
+    with pytest.raises(urllib.error.HTTPError):
+        download(server.url, path, workers=4, chunk_size=CHUNK)
+    assert not path.exists()
+
+    with open(tmp_path / "data.zip.part.json") as f:
+        done = json.load(f)["done"]
+    assert done and 0 not in done
+
+    server.requests.clear()
+    assert download(server.url, path, workers=4, chunk_size=CHUNK)
+    assert path.read_bytes() == PAYLOAD
+    assert len(server.requests) == 10 - len(done)
+    assert "bytes=0-1023" in server.requests
+    assert not (tmp_path / "data.zip.part").exists()
+    assert not (tmp_path / "data.zip.part.json").exists()
+
+
+@pytest.mark.parametrize("server", [False], indirect=True)
+def test_server_without_ranges_gets_one_plain_request(server, tmp_path):
+    path = tmp_path / "data.zip"
+    assert download(server.url, path, expected_sha256=hashlib.sha256(PAYLOAD).hexdigest(), chunk_size=CHUNK)
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == [None]
+
+    # A file that already matches the digest is kept
+    assert not download(server.url, path, expected_sha256=hashlib.sha256(PAYLOAD).hexdigest())
+    assert server.requests == [None]
+
+
+def test_sha256_mismatch_keeps_nothing(server, tmp_path):
+    path = tmp_path / "data.zip"
+    with pytest.raises(ValueError, match="SHA-256"):
+        download(server.url, path, expected_sha256="0" * 64, chunk_size=CHUNK)
+    assert not path.exists()
+    assert not (tmp_path / "data.zip.part").exists()
+
+
+def ingestion_config(tmp_path, url: str):
+    """
+    The data ingestion config as the pipeline builds it, from a config.yaml
+    whose paths point into `tmp_path`.
+    """
+    with open(REPO / "config" / "config.yaml") as f:
+        content = yaml.safe_load(f)
+    content["artifacts_root"] = str(tmp_path)
+    content["data_ingestion"].update(
+        root_dir=str(tmp_path),
+        source_URL=url,
+        local_data_file=str(tmp_path / "data.zip"),
+        unzip_dir=str(tmp_path),
+        data_dir=str(tmp_path / "data"),
+        manifest_file=str(tmp_path / "manifest.json"),
+        expected_sha256="",
+        sha256_file=str(tmp_path / "data.zip.sha256"),
+        download_workers=2,
+        download_chunk_mb=1,
+        download_timeout=10
+    )
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, "w") as f:
+        yaml.safe_dump(content, f)
+    return ConfigurationManager(config_file, REPO / "params.yaml").get_data_ingestion_config()
+
+
+def test_first_download_pins_its_digest(server, tmp_path):
+    config = ingestion_config(tmp_path, server.url)
+    assert DataIngestion(config).download_file()
+    assert (tmp_path / "data.zip.sha256").read_text().strip() == hashlib.sha256(PAYLOAD).hexdigest()
+
+    # A changed remote file no longer matches the pinned digest
+    (tmp_path / "data.zip").unlink()
+    server.payload = PAYLOAD[::-1]
+    with pytest.raises(ValueError, match="SHA-256"):
+        DataIngestion(config).download_file()
+    assert not (tmp_path / "data.zip").exists()
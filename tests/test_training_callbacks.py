@@ -0,0 +1,36 @@
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier.components.training_callbacks import BestWeightsEarlyStopping
+
+
+def run_epochs(callback, model, val_losses: list):
+    callback.set_model(model)
+    callback.on_train_begin()
+    for epoch, val_loss in enumerate(val_losses):
+        # Every epoch leaves its number as the weights
+        model.set_weights([np.full_like(weight, epoch) for weight in model.get_weights()])
+        callback.on_epoch_end(epoch, {"val_loss": val_loss})
+        if model.stop_training:
+            break
+    callback.on_train_end()
+
+
+def make_model():
+    model = tf.keras.Sequential([tf.keras.Input((2,)), tf.keras.layers.Dense(1)])
+    model.stop_training = False
+    return model
+
+
+def test_best_weights_restored_when_all_epochs_run():
+    model = make_model()
+    run_epochs(BestWeightsEarlyStopping(monitor="val_loss", patience=5), model, [1.0, 0.5, 0.7, 0.8])
+    assert not model.stop_training
+    assert all((weight == 1).all() for weight in model.get_weights())
+
+
+def test_best_weights_restored_when_stopping_early():
+    model = make_model()
+    run_epochs(BestWeightsEarlyStopping(monitor="val_loss", patience=1), model, [1.0, 0.5, 0.7, 0.8])
+    assert model.stop_training
+    assert all((weight == 1).all() for weight in model.get_weights())
@@ -0,0 +1,56 @@
+import fcntl
+import threading
+import time
+
+from cnnClassifier.entity.config_entity import TrainingJobConfig
+from cnnClassifier.pipeline.training_job import TrainingJobRunner
+
+
+def slow_unlock(monkeypatch, released: threading.Event):
+    """
+    Hold the run lock for a while after a job finished, so submits land in the release.
+    """
+    flock = fcntl.flock
+
+    def delayed(file, operation):
+        if operation == fcntl.LOCK_UN:
+            released.set()
+            time.sleep(0.3)
+        flock(file, operation)
+
+    monkeypatch.setattr(fcntl, "flock", delayed)
+
+
+def wait_finished(runner, job_id):
+    # Until the run lock is released too, so no unlock leaks into the next test's patched flock
+    while runner.status(job_id)["status"] == "running" or runner._active is not None:
+        time.sleep(0.01)
+
+
+def test_submit_while_the_job_is_released(tmp_path, monkeypatch):
+    runner = TrainingJobRunner(TrainingJobConfig(root_dir=tmp_path, command="true", max_log_lines=10))
+    released = threading.Event()
+    slow_unlock(monkeypatch, released)
+
+    job, created = runner.submit()
+    assert created
+    released.wait(5)
+    # Either the finishing job is still active or the lock is free, never a 500
+    job, _ = runner.submit()
+    assert job["status"] in ("running", "succeeded")
+    wait_finished(runner, job["job_id"])
+
+
+def test_submit_from_another_worker_while_the_job_is_released(tmp_path, monkeypatch):
+    config = TrainingJobConfig(root_dir=tmp_path, command="true", max_log_lines=10)
+    # Two runners share only the state files and the lock, like two server workers
+    first, other = TrainingJobRunner(config), TrainingJobRunner(config)
+    released = threading.Event()
+    slow_unlock(monkeypatch, released)
+
+    job, created = first.submit()
+    assert created
+    released.wait(5)
+    second, created = other.submit()
+    assert created and second["job_id"] != job["job_id"]
+    wait_finished(other, second["job_id"])